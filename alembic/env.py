@@ -10,7 +10,9 @@ from app.config import settings
 from app.database import Base
 
 # Import all models for autogenerate support
-from app.models import user, category, transaction  # noqa: F401
+from app.models import (  # noqa: F401
+    user, category, transaction, transaction_daily_total, user_transaction_stats, transaction_balance_checkpoint
+)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,47 @@
+"""create_transaction_daily_totals_table
+
+Revision ID: 5d8e2a4c7b19
+Revises: 9c1f3b7d2e64
+Create Date: 2026-10-18 11:03:47.918342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2a4c7b19'
+down_revision: Union[str, Sequence[str], None] = '9c1f3b7d2e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transaction_daily_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('transaction_type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'category_id', 'transaction_type')
+    )
+
+    # 既存のトランザクションから日次集計を作成（カテゴリーなしはcategory_id=0）
+    op.execute("""
+        INSERT INTO transaction_daily_totals
+            (user_id, date, category_id, transaction_type, total_amount, transaction_count)
+        SELECT user_id, transaction_date, COALESCE(category_id, 0), transaction_type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, transaction_date, COALESCE(category_id, 0), transaction_type
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_daily_totals')
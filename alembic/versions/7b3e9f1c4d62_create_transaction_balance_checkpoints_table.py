@@ -0,0 +1,35 @@
+"""create_transaction_balance_checkpoints_table
+
+Revision ID: 7b3e9f1c4d62
+Revises: a4f2d8c6e915
+Create Date: 2026-10-18 22:41:37.209815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e9f1c4d62'
+down_revision: Union[str, Sequence[str], None] = 'a4f2d8c6e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # チェックポイントは python -m app.cli refresh-balance-checkpoints で作成する
+    op.create_table('transaction_balance_checkpoints',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month_start', sa.Date(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'month_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_balance_checkpoints')
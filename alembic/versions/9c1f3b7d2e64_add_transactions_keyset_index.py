@@ -0,0 +1,34 @@
+"""add_transactions_keyset_index
+
+Revision ID: 9c1f3b7d2e64
+Revises: 4be1019923a4
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1f3b7d2e64'
+down_revision: Union[str, Sequence[str], None] = '4be1019923a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 一覧取得のキーセットページング用の複合インデックスを作成
+    op.create_index(
+        'ix_transactions_user_id_transaction_date_id',
+        'transactions',
+        ['user_id', sa.text('transaction_date DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_id_transaction_date_id', table_name='transactions')
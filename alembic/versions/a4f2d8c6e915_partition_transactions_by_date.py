@@ -0,0 +1,114 @@
+"""partition_transactions_by_date
+
+Revision ID: a4f2d8c6e915
+Revises: e3a7c1d95b28
+Create Date: 2026-10-18 13:52:40.381926
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+from app.partitions import DEFAULT_PARTITION, create_partition_sql, partition_start, shift_partition_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f2d8c6e915'
+down_revision: Union[str, Sequence[str], None] = 'e3a7c1d95b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 作成時点で用意しておく将来分のパーティション数
+PARTITIONS_AHEAD = 3
+
+INDEXES = [
+    ('ix_transactions_category_id', ['category_id']),
+    ('ix_transactions_id', ['id']),
+    ('ix_transactions_transaction_date', ['transaction_date']),
+    ('ix_transactions_user_id', ['user_id']),
+    ('ix_transactions_user_id_transaction_date_id', ['user_id', sa.text('transaction_date DESC'), sa.text('id DESC')]),
+]
+
+
+def _transaction_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('transactions_id_seq'::regclass)"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('transaction_type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('transaction_date', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], name='transactions_category_id_fkey', ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='transactions_user_id_fkey'),
+    ]
+
+
+def _move_aside_transactions():
+    """既存のtransactionsを transactions_previous に退避（インデックス・主キー名・シーケンスを解放）"""
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='transactions')
+    op.rename_table('transactions', 'transactions_previous')
+    op.execute('ALTER TABLE transactions_previous RENAME CONSTRAINT transactions_pkey TO transactions_previous_pkey')
+    # 退避テーブルの削除でIDのシーケンスが消えないよう所有を外す
+    op.execute('ALTER SEQUENCE transactions_id_seq OWNED BY NONE')
+
+
+def _copy_from_previous():
+    """退避したテーブルからデータを移し、インデックスを作成"""
+    op.execute('INSERT INTO transactions SELECT * FROM transactions_previous')
+    op.drop_table('transactions_previous')
+    op.execute('ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id')
+    for name, columns in INDEXES:
+        op.create_index(name, 'transactions', columns, unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 宣言的パーティションはPostgreSQLのみ
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    interval = settings.TRANSACTION_PARTITION_INTERVAL
+    first_date = op.get_bind().execute(sa.text('SELECT MIN(transaction_date) FROM transactions')).scalar()
+
+    # パーティションキーを主キーに含める必要があるため (id, transaction_date) に変更
+    _move_aside_transactions()
+    op.create_table(
+        'transactions',
+        *_transaction_columns(),
+        sa.PrimaryKeyConstraint('id', 'transaction_date', name='transactions_pkey'),
+        postgresql_partition_by='RANGE (transaction_date)'
+    )
+
+    # 既存データの最古の期から PARTITIONS_AHEAD 期先まで作成し、範囲外はデフォルトパーティションへ
+    current = partition_start(date.today(), interval)
+    start = partition_start(first_date, interval) if first_date is not None else current
+    last = shift_partition_start(current, interval, PARTITIONS_AHEAD)
+    while start <= last:
+        op.execute(create_partition_sql(start, interval))
+        start = shift_partition_start(start, interval)
+    op.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF transactions DEFAULT')
+
+    _copy_from_previous()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # 通常のテーブルに戻す（パーティションは退避した親テーブルとともに削除される）
+    _move_aside_transactions()
+    op.create_table(
+        'transactions',
+        *_transaction_columns(),
+        sa.PrimaryKeyConstraint('id', name='transactions_pkey')
+    )
+    _copy_from_previous()
@@ -0,0 +1,53 @@
+"""store_amounts_as_minor_units
+
+Revision ID: b5e7c2f9a184
+Revises: f1b8d3a6c529
+Create Date: 2026-10-19 14:27:15.903381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e7c2f9a184'
+down_revision: Union[str, Sequence[str], None] = 'f1b8d3a6c529'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (テーブル, 金額の列, 補助単位の列, 元の型)
+AMOUNT_COLUMNS = [
+    ('transactions', 'amount', 'amount_minor', sa.Numeric(precision=10, scale=2)),
+    ('transaction_daily_totals', 'total_amount', 'total_amount_minor', sa.Numeric(precision=14, scale=2)),
+    ('transaction_balance_checkpoints', 'balance', 'balance_minor', sa.Numeric(precision=16, scale=2)),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 金額を補助単位（1/100）のBIGINTに変換（型の変更時に既存の値も変換される）
+    # transactionsがパーティションテーブルの場合は各パーティションにも反映される
+    for table, column, minor_column, _ in AMOUNT_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.BigInteger(),
+            postgresql_using=f'round({column} * 100)::bigint',
+            existing_nullable=False
+        )
+        op.alter_column(table, column, new_column_name=minor_column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, minor_column, numeric_type in AMOUNT_COLUMNS:
+        op.alter_column(table, minor_column, new_column_name=column)
+        op.alter_column(
+            table,
+            column,
+            type_=numeric_type,
+            postgresql_using=f'{column} / 100.0',
+            existing_nullable=False
+        )
@@ -0,0 +1,39 @@
+"""add_transaction_count_to_user_transaction_stats
+
+Revision ID: d6c4a1e8b307
+Revises: 7b3e9f1c4d62
+Create Date: 2026-10-19 09:12:48.630154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6c4a1e8b307'
+down_revision: Union[str, Sequence[str], None] = '7b3e9f1c4d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'user_transaction_stats',
+        sa.Column('transaction_count', sa.BigInteger(), nullable=False, server_default='0')
+    )
+
+    # 既存のトランザクション件数を設定
+    op.execute("""
+        UPDATE user_transaction_stats
+        SET transaction_count = (
+            SELECT COUNT(*) FROM transactions WHERE transactions.user_id = user_transaction_stats.user_id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_transaction_stats', 'transaction_count')
@@ -0,0 +1,39 @@
+"""create_user_transaction_stats_table
+
+Revision ID: e3a7c1d95b28
+Revises: 5d8e2a4c7b19
+Create Date: 2026-10-18 13:24:06.514207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c1d95b28'
+down_revision: Union[str, Sequence[str], None] = '5d8e2a4c7b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_transaction_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # 既存のトランザクションを持つユーザーの行を作成
+    op.execute("""
+        INSERT INTO user_transaction_stats (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM transactions
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_transaction_stats')
@@ -0,0 +1,40 @@
+"""add_transaction_description_search
+
+Revision ID: f1b8d3a6c529
+Revises: d6c4a1e8b307
+Create Date: 2026-10-19 11:03:52.418967
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.search import POSTGRESQL_DDL, POSTGRESQL_DROP_DDL, SQLITE_DDL, SQLITE_DROP_DDL, SQLITE_REBUILD
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b8d3a6c529'
+down_revision: Union[str, Sequence[str], None] = 'd6c4a1e8b307'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # PostgreSQL: pg_trgmのGINインデックス（パーティションテーブルの場合は各パーティションにも作成される）
+    # SQLite: FTS5の外部コンテンツテーブルと同期用トリガーを作成し、既存の行から索引を作る
+    if op.get_bind().dialect.name == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            op.execute(statement)
+    else:
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        op.execute(SQLITE_REBUILD)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # pg_trgm拡張は他で使われている可能性があるため残す
+    statements = POSTGRESQL_DROP_DDL if op.get_bind().dialect.name == "postgresql" else SQLITE_DROP_DDL
+    for statement in statements:
+        op.execute(statement)
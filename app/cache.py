@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+from app.config import settings
+from app.schemas.category import CategoryResponse
+
+
+class CategoryCache:
+    """カテゴリーのプロセス内キャッシュ（IDと名前で参照）
+
+    書き込み時は同じプロセスのキャッシュを即時更新し、他のワーカーでの変更は
+    TTL経過後の再読み込みで反映する
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._by_id: dict[int, CategoryResponse] = {}
+        self._by_name: dict[str, CategoryResponse] = {}
+        self._loaded_at: float | None = None
+        # 内容が変わるたびに増える番号
+        self.version = 0
+        self._etag: tuple[int, str] | None = None
+
+    def is_fresh(self) -> bool:
+        """TTL内に全件読み込み済みか"""
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def replace_all(self, categories: list[CategoryResponse]):
+        """全件を入れ替え"""
+        self._by_id = {category.id: category for category in categories}
+        self._by_name = {category.name: category for category in categories}
+        self._loaded_at = time.monotonic()
+        self.version += 1
+
+    def put(self, category: CategoryResponse):
+        """1件を追加・更新"""
+        previous = self._by_id.get(category.id)
+        if previous is not None:
+            self._by_name.pop(previous.name, None)
+        self._by_id[category.id] = category
+        self._by_name[category.name] = category
+        self.version += 1
+
+    def remove(self, category_id: int):
+        """1件を削除"""
+        previous = self._by_id.pop(category_id, None)
+        if previous is not None:
+            self._by_name.pop(previous.name, None)
+        self.version += 1
+
+    def clear(self):
+        """キャッシュを破棄（次回参照時に再読み込み）"""
+        self._by_id = {}
+        self._by_name = {}
+        self._loaded_at = None
+        self.version += 1
+
+    def get(self, category_id: int) -> CategoryResponse | None:
+        return self._by_id.get(category_id)
+
+    def get_by_name(self, name: str) -> CategoryResponse | None:
+        return self._by_name.get(name)
+
+    def count(self) -> int:
+        return len(self._by_id)
+
+    def etag(self) -> str:
+        """内容から計算したハッシュ（ワーカー間で同じ内容なら同じ値、versionごとに1回だけ計算）"""
+        if self._etag is None or self._etag[0] != self.version:
+            digest = hashlib.blake2b(digest_size=8)
+            for category in self.list(limit=len(self._by_id)):
+                digest.update(f"{category.id}:{category.name}:{category.updated_at.isoformat()}\n".encode())
+            self._etag = (self.version, digest.hexdigest())
+        return self._etag[1]
+
+    def list(self, skip: int = 0, limit: int = 100) -> list[CategoryResponse]:
+        """ID順の一覧"""
+        return sorted(self._by_id.values(), key=lambda category: category.id)[skip:skip + limit]
+
+
+category_cache = CategoryCache(ttl_seconds=settings.CATEGORY_CACHE_TTL_SECONDS)
@@ -0,0 +1,101 @@
+"""メンテナンス用コマンド
+
+使い方:
+    python -m app.cli rebuild-daily-totals [--user-id USER_ID]
+    python -m app.cli refresh-balance-checkpoints [--user-id USER_ID]
+    python -m app.cli create-partitions [--ahead N]
+    python -m app.cli detach-partitions --keep N [--archive-schema SCHEMA | --drop]
+"""
+import argparse
+
+from app.config import settings
+from app.crud.transaction_balance_checkpoint import refresh_balance_checkpoints
+from app.crud.transaction_daily_total import rebuild_daily_totals
+from app.database import SessionLocal
+from app.partitions import create_future_partitions, detach_old_partitions
+
+
+def _rebuild_daily_totals(args: argparse.Namespace):
+    db = SessionLocal()
+    try:
+        rebuild_daily_totals(db, user_id=args.user_id)
+    finally:
+        db.close()
+    target = f"user_id={args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt transaction_daily_totals for {target}")
+
+
+def _refresh_balance_checkpoints(args: argparse.Namespace):
+    db = SessionLocal()
+    try:
+        created = refresh_balance_checkpoints(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"Created {created} balance checkpoints")
+
+
+def _create_partitions(args: argparse.Namespace):
+    db = SessionLocal()
+    try:
+        created = create_future_partitions(db, ahead=args.ahead, interval=settings.TRANSACTION_PARTITION_INTERVAL)
+    finally:
+        db.close()
+    print(f"Created partitions: {', '.join(created)}" if created else "No partitions to create")
+
+
+def _detach_partitions(args: argparse.Namespace):
+    db = SessionLocal()
+    try:
+        detached = detach_old_partitions(
+            db,
+            keep=args.keep,
+            interval=settings.TRANSACTION_PARTITION_INTERVAL,
+            archive_schema=args.archive_schema,
+            drop=args.drop
+        )
+    finally:
+        db.close()
+    print(f"Detached partitions: {', '.join(detached)}" if detached else "No partitions to detach")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Cash Mesh maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild-daily-totals",
+        help="Recompute transaction_daily_totals from the transactions table"
+    )
+    rebuild_parser.add_argument("--user-id", type=int, default=None, help="Rebuild only this user")
+    rebuild_parser.set_defaults(func=_rebuild_daily_totals)
+
+    checkpoint_parser = subparsers.add_parser(
+        "refresh-balance-checkpoints",
+        help="Create month-start balance checkpoints up to the current month (run periodically, e.g. daily)"
+    )
+    checkpoint_parser.add_argument("--user-id", type=int, default=None, help="Refresh only this user")
+    checkpoint_parser.set_defaults(func=_refresh_balance_checkpoints)
+
+    create_parser = subparsers.add_parser(
+        "create-partitions",
+        help="Create transactions partitions from the current period up to --ahead periods ahead (PostgreSQL)"
+    )
+    create_parser.add_argument("--ahead", type=int, default=3, help="Periods (months or years) to create ahead")
+    create_parser.set_defaults(func=_create_partitions)
+
+    detach_parser = subparsers.add_parser(
+        "detach-partitions",
+        help="Detach transactions partitions that ended more than --keep periods ago (PostgreSQL)"
+    )
+    detach_parser.add_argument("--keep", type=int, required=True, help="Past periods (months or years) to keep attached")
+    archive_group = detach_parser.add_mutually_exclusive_group()
+    archive_group.add_argument("--archive-schema", default=None, help="Move detached partitions into this schema")
+    archive_group.add_argument("--drop", action="store_true", help="Drop detached partitions")
+    detach_parser.set_defaults(func=_detach_partitions)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
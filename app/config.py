@@ -1,9 +1,40 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str | None = None
+    # Trueの場合は非同期ドライバー（asyncpg / aiosqlite）でDBにアクセス
+    DATABASE_ASYNC: bool = False
+
+    # 参照系（GET）エンドポイント用のリードレプリカ（カンマ区切りで複数指定可、未指定はプライマリのみ）
+    DATABASE_READ_URL: str | None = None
+    # 書き込み後にこの秒数だけ同じクライアントの参照をプライマリに固定（read-your-writes、0で無効）
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # transactionsのパーティション単位（PostgreSQL、マイグレーション適用時と同じ値を使う）
+    TRANSACTION_PARTITION_INTERVAL: Literal["month", "year"] = "month"
+
+    # Connection pool（SQLiteのインメモリDBなどQueuePool以外ではSIZE/OVERFLOW/TIMEOUTは無視）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # 取得待ちのタイムアウト秒数
+    DB_POOL_TIMEOUT: float = 30.0
+    # この秒数を超えた接続は取得時に作り直す（-1で無効）
+    DB_POOL_RECYCLE: int = 1800
+    # Trueの場合はチェックアウトごとに接続を確認（1往復増える）。Falseでも切断エラー時はプールごと作り直す
+    DB_POOL_PRE_PING: bool = False
+
+    # Category cache
+    # 他のワーカーでの変更を反映するまでの最大秒数
+    CATEGORY_CACHE_TTL_SECONDS: float = 60.0
+    # 起動時にカテゴリーを読み込むか
+    CATEGORY_CACHE_PRELOAD: bool = True
+
+    # Trueの場合、一覧APIは行ごとのPydantic検証を省略して直接JSONに変換（orjsonがあれば使用）
+    FAST_JSON_RESPONSES: bool = False
 
     # App
     APP_NAME: str = "Cash Mesh API"
@@ -1,7 +1,25 @@
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
+from app.cache import category_cache
+from app.crud.transaction_daily_total import move_category_to_uncategorized
+from app.crud.user_transaction_stats import bump_transaction_versions_for_category
+from app.database import atomic
 from app.models.category import Category
-from app.schemas.category import CategoryCreate
+from app.schemas.category import CategoryCreate, CategoryResponse
+
+
+def load_category_cache(db: Session):
+    """全カテゴリーをキャッシュに読み込み"""
+    categories = db.query(Category).order_by(Category.id).all()
+    category_cache.replace_all([CategoryResponse.model_validate(category) for category in categories])
+
+
+def _fresh_category_cache(db: Session):
+    """TTL切れの場合は再読み込みしたキャッシュを返す"""
+    if not category_cache.is_fresh():
+        load_category_cache(db)
+    return category_cache
 
 
 def get_category(db: Session, category_id: int):
@@ -9,30 +27,76 @@ def get_category(db: Session, category_id: int):
     return db.query(Category).filter(Category.id == category_id).first()
 
 
+def get_cached_category(db: Session, category_id: int) -> CategoryResponse | None:
+    """カテゴリーをIDで取得（キャッシュ優先、キャッシュにない場合のみDBを参照）"""
+    cached = _fresh_category_cache(db).get(category_id)
+    if cached is not None:
+        return cached
+
+    # 他のワーカーで作成された直後の可能性があるためDBを確認
+    db_category = get_category(db, category_id=category_id)
+    if db_category is None:
+        return None
+    cached = CategoryResponse.model_validate(db_category)
+    category_cache.put(cached)
+    return cached
+
+
+def get_existing_category_ids(db: Session, category_ids: set[int]) -> set[int]:
+    """指定IDのうち存在するカテゴリーIDを1クエリで取得
+
+    外部キーとして書き込む前の確認のため、キャッシュは使わない
+    （他のワーカーで削除されたカテゴリーがTTLの間キャッシュに残るため）
+    """
+    if not category_ids:
+        return set()
+    return set(db.scalars(select(Category.id).where(Category.id.in_(category_ids))))
+
+
+def get_categories_etag(db: Session) -> str:
+    """カテゴリー一覧のETag用ハッシュ（キャッシュから）"""
+    return _fresh_category_cache(db).etag()
+
+
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    """全カテゴリー一覧を取得"""
-    return db.query(Category).offset(skip).limit(limit).all()
+    """全カテゴリー一覧を取得（キャッシュから）"""
+    return _fresh_category_cache(db).list(skip=skip, limit=limit)
+
+
+def count_categories(db: Session) -> int:
+    """カテゴリー数（キャッシュから）"""
+    return _fresh_category_cache(db).count()
 
 
 def create_category(db: Session, category: CategoryCreate):
-    """カテゴリーを作成"""
-    db_category = Category(name=category.name)
-    db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    """カテゴリーを作成（INSERT ... RETURNINGで作成後の行を取得）"""
+    with atomic(db):
+        db_category = db.execute(
+            insert(Category).values(name=category.name).returning(*Category.__table__.columns)
+        ).one()
+    category_cache.put(CategoryResponse.model_validate(db_category))
     return db_category
 
 
 def update_category(db: Session, db_category: Category, category: CategoryCreate):
-    """カテゴリーを更新"""
-    for field_name, field_value in category.model_dump().items():
-        setattr(db_category, field_name, field_value)
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    """カテゴリーを更新（UPDATE ... RETURNINGで更新後の行を取得）"""
+    with atomic(db):
+        updated = db.execute(
+            update(Category)
+            .where(Category.id == db_category.id)
+            .values(**category.model_dump())
+            .returning(*Category.__table__.columns)
+            .execution_options(synchronize_session=False)
+        ).one()
+    category_cache.put(CategoryResponse.model_validate(updated))
+    return updated
 
 
 def delete_category(db: Session, db_category: Category):
     """カテゴリーを削除"""
+    # 紐づくトランザクションはカテゴリーなしになるため日次集計も移動
+    move_category_to_uncategorized(db, db_category.id)
+    bump_transaction_versions_for_category(db, db_category.id)
     db.delete(db_category)
     db.commit()
+    category_cache.remove(db_category.id)
@@ -1,27 +1,45 @@
+import base64
 from datetime import date
+
+from sqlalchemy import column, delete, func, insert, literal_column, select, table, tuple_, update
 from sqlalchemy.orm import Session
 
+from app.crud.transaction_balance_checkpoint import invalidate_balance_checkpoints
+from app.crud.transaction_daily_total import apply_daily_total_deltas, daily_total_delta, truncate_date
+from app.crud.user_transaction_stats import bump_transaction_versions
+from app.database import atomic
 from app.models.transaction import Transaction, TransactionType
+from app.models.transaction_daily_total import TransactionDailyTotal, UNCATEGORIZED_ID
 from app.schemas.transaction import TransactionCreate
+from app.search import FTS_TABLE, escape_like, fts_phrase
 
 
-def get_transaction(db: Session, transaction_id: int):
-    """トランザクションをIDで取得"""
-    return db.query(Transaction).filter(Transaction.id == transaction_id).first()
+def encode_cursor(transaction_date: date, transaction_id: int) -> str:
+    """ページング用カーソルを生成（transaction_dateとidをエンコード）"""
+    raw = f"{transaction_date.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
 
-def get_transactions(
-    db: Session,
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    """ページング用カーソルを復元（不正な値はValueError）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_part, id_part = raw.split("|")
+        return date.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _filter_transactions(
+    query,
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
     transaction_type: str | None = None,
     category_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None
 ):
-    """ユーザーのトランザクション一覧を取得（フィルター対応）"""
-    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    """一覧・集計で共通のフィルター条件を適用"""
+    query = query.filter(Transaction.user_id == user_id)
 
     if transaction_type:
         query = query.filter(Transaction.transaction_type == transaction_type) # type: ignore
@@ -35,35 +53,347 @@ def get_transactions(
     if end_date:
         query = query.filter(Transaction.transaction_date <= end_date)
 
-    return query.order_by(Transaction.transaction_date.desc()).offset(skip).limit(limit).all()
+    return query
 
 
-def create_transaction(db: Session, transaction: TransactionCreate, user_id: int):
-    """トランザクションを作成"""
-    db_transaction = Transaction(
-        category_id=transaction.category_id,
-        amount=transaction.amount,
-        transaction_type=transaction.transaction_type,
-        description=transaction.description,
-        transaction_date=transaction.transaction_date,
-        user_id=user_id
+def _search_transactions(db: Session, query, q: str):
+    """説明文の全文検索で絞り込み、関連度順の並び替え条件を返す"""
+    if db.get_bind().dialect.name == "postgresql":
+        # pg_trgmのGINインデックスで部分一致を処理し、単語単位の類似度で順位付け
+        query = query.filter(Transaction.description.ilike(f"%{escape_like(q)}%", escape="\\"))
+        return query, func.word_similarity(q, Transaction.description).desc()
+
+    # SQLiteはFTS5の外部コンテンツテーブル（rowid = transactions.id）から検索し、bm25で順位付け
+    fts = table(FTS_TABLE, column("rowid"), column("rank"))
+    query = query.join(fts, fts.c.rowid == Transaction.id).filter(
+        literal_column(FTS_TABLE).op("MATCH")(fts_phrase(q))
     )
-    db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+    return query, fts.c.rank
+
+
+def _filter_daily_totals(
+    query,
+    user_id: int,
+    transaction_type: str | None = None,
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None
+):
+    """_filter_transactions と同じ条件を日次集計に適用"""
+    query = query.filter(TransactionDailyTotal.user_id == user_id)
+
+    if transaction_type:
+        query = query.filter(TransactionDailyTotal.transaction_type == transaction_type) # type: ignore
+
+    if category_id is not None:
+        query = query.filter(TransactionDailyTotal.category_id == category_id)
 
+    if start_date:
+        query = query.filter(TransactionDailyTotal.date >= start_date)
+
+    if end_date:
+        query = query.filter(TransactionDailyTotal.date <= end_date)
+
+    return query
+
+
+# RETURNING・エクスポートで取得する列（TransactionResponseと同じ項目）
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.user_id,
+    Transaction.category_id,
+    Transaction.amount,
+    Transaction.transaction_type,
+    Transaction.description,
+    Transaction.transaction_date,
+    Transaction.created_at,
+    Transaction.updated_at,
+)
+
+
+# fields= で指定できる列名と列の対応
+TRANSACTION_FIELDS = {column.key: column for column in TRANSACTION_COLUMNS}
+
+
+def _select_columns(fields: list[str] | None):
+    """一覧で取得する列（fields未指定時はORMエンティティ）"""
+    if fields is None:
+        return [Transaction]
+    names = dict.fromkeys([*fields, "id", "transaction_date"])
+    return [TRANSACTION_FIELDS[name] for name in names]
+
+
+def _daily_total_delta(db_transaction: Transaction, sign: int = 1) -> dict:
+    """トランザクションの日次集計への差分"""
+    return daily_total_delta(
+        db_transaction.user_id,
+        db_transaction.transaction_date,
+        db_transaction.category_id,
+        db_transaction.transaction_type,
+        db_transaction.amount,
+        sign=sign
+    )
 
-def update_transaction(db: Session, db_transaction: Transaction, transaction: TransactionCreate):
-    """トランザクションを更新"""
-    for field_name, field_value in transaction.model_dump().items():
-        setattr(db_transaction, field_name, field_value)
-    db.commit()
-    db.refresh(db_transaction)
+
+def get_transaction(db: Session, transaction_id: int):
+    """トランザクションをIDで取得"""
+    return db.query(Transaction).filter(Transaction.id == transaction_id).first()
+
+
+def get_transactions_by_ids(db: Session, transaction_ids: list[int], user_id: int):
+    """指定IDのうちユーザーのトランザクションと、他のユーザーのトランザクションのIDを取得
+
+    ユーザーで絞り込んだ1クエリで取得し、見つからなかったIDがある場合だけ
+    存在しないのか他人のものなのかをIDのみの1クエリで判定する
+    """
+    requested_ids = set(transaction_ids)
+    owned = {
+        db_transaction.id: db_transaction
+        for db_transaction in db.query(Transaction).filter(
+            Transaction.id.in_(requested_ids), Transaction.user_id == user_id
+        )
+    }
+    missing_ids = requested_ids - owned.keys()
+    forbidden_ids = set()
+    if missing_ids:
+        forbidden_ids = set(db.scalars(select(Transaction.id).where(Transaction.id.in_(missing_ids))))
+    return owned, forbidden_ids
+
+
+def get_transactions(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    transaction_type: str | None = None,
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    cursor: tuple[date, int] | None = None,
+    fields: list[str] | None = None,
+    q: str | None = None
+):
+    """ユーザーのトランザクション一覧を取得（フィルター・カーソルページング対応）
+
+    fields指定時はその列（とカーソル用のid・transaction_date）だけをSELECTし、
+    ORMエンティティを生成せず行のまま返す。
+    q指定時は説明文の全文検索に一致するものを関連度順に返す（カーソルは使えない）
+    """
+    query = _filter_transactions(
+        db.query(*_select_columns(fields)),
+        user_id=user_id,
+        transaction_type=transaction_type,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    order_by = [Transaction.transaction_date.desc(), Transaction.id.desc()]
+    if q:
+        query, rank = _search_transactions(db, query, q)
+        order_by.insert(0, rank)
+
+    # カーソル指定時は (transaction_date, id) より後の行から取得（キーセットページング）
+    # 行値の比較ではパーティションが絞り込まれないため、日付だけの条件も重ねて指定
+    elif cursor is not None:
+        query = query.filter(
+            Transaction.transaction_date <= cursor[0],
+            tuple_(Transaction.transaction_date, Transaction.id) < cursor
+        )
+
+    return query.order_by(*order_by).offset(skip).limit(limit).all()
+
+
+def export_statement(
+    user_id: int,
+    transaction_type: str | None = None,
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    fields: list[str] | None = None
+):
+    """エクスポート用のSELECT文を作成
+
+    ORMエンティティは生成せずCoreの行を返す。サーバーサイドカーソルで
+    バッチごとに読み出すことで、件数に関わらずメモリ使用量は一定
+    """
+    columns = TRANSACTION_COLUMNS if fields is None else [TRANSACTION_FIELDS[field] for field in fields]
+    return _filter_transactions(
+        select(*columns),
+        user_id=user_id,
+        transaction_type=transaction_type,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date
+    ).order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+
+
+def count_transactions(
+    db: Session,
+    user_id: int,
+    transaction_type: str | None = None,
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    q: str | None = None,
+    exact: bool = False
+) -> int:
+    """フィルター条件に一致するトランザクション件数
+
+    通常は日次集計の件数を合計する（フィルター条件はすべて日次集計のキーに含まれるため同じ値になる）。
+    exact=True・全文検索（q）指定時と、category_idがUNCATEGORIZED_IDの場合はトランザクションをCOUNT(*)する
+    （日次集計ではカテゴリーなしの行を表すが、一覧ではそのIDのカテゴリーとして絞り込むため）
+    """
+    filters = {
+        "user_id": user_id,
+        "transaction_type": transaction_type,
+        "category_id": category_id,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    if q:
+        query, _ = _search_transactions(db, _filter_transactions(db.query(func.count(Transaction.id)), **filters), q)
+        return query.scalar()
+    if exact or category_id == UNCATEGORIZED_ID:
+        return _filter_transactions(db.query(func.count(Transaction.id)), **filters).scalar()
+    total = _filter_daily_totals(db.query(func.sum(TransactionDailyTotal.transaction_count)), **filters).scalar()
+    return int(total or 0)
+
+
+def get_transaction_summary(
+    db: Session,
+    user_id: int,
+    period: str = "month",
+    transaction_type: str | None = None,
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None
+):
+    """期間・収支タイプ・カテゴリーごとの合計金額と件数を集計（日次集計テーブルのみ参照）"""
+    period_start = truncate_date(db, period, TransactionDailyTotal.date).label("period_start")
+    query = db.query(
+        period_start,
+        TransactionDailyTotal.transaction_type,
+        func.nullif(TransactionDailyTotal.category_id, UNCATEGORIZED_ID).label("category_id"),
+        func.sum(TransactionDailyTotal.total_amount).label("total_amount"),
+        func.sum(TransactionDailyTotal.transaction_count).label("count"),
+    )
+    query = _filter_daily_totals(
+        query,
+        user_id=user_id,
+        transaction_type=transaction_type,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    return (
+        query.group_by(period_start, TransactionDailyTotal.transaction_type, TransactionDailyTotal.category_id)
+        .order_by(period_start, TransactionDailyTotal.transaction_type, TransactionDailyTotal.category_id)
+        .all()
+    )
+
+
+def create_transaction(db: Session, transaction: TransactionCreate, user_id: int):
+    """トランザクションを作成（INSERT ... RETURNINGで作成後の行を取得）"""
+    with atomic(db):
+        db_transaction = db.execute(
+            insert(Transaction)
+            .values(**transaction.model_dump(), user_id=user_id)
+            .returning(*TRANSACTION_COLUMNS)
+        ).one()
+        deltas = [_daily_total_delta(db_transaction)]
+        apply_daily_total_deltas(db, deltas)
+        bump_transaction_versions(db, {user_id}, count_delta=1)
+        invalidate_balance_checkpoints(db, deltas)
     return db_transaction
 
 
-def delete_transaction(db: Session, db_transaction: Transaction):
-    """トランザクションを削除"""
-    db.delete(db_transaction)
-    db.commit()
+def create_transactions(db: Session, transactions: list[TransactionCreate], user_id: int) -> list[int]:
+    """トランザクションを一括作成（executemanyで1回のコミット）し、作成IDを返す"""
+    if not transactions:
+        return []
+    rows = [{**transaction.model_dump(), "user_id": user_id} for transaction in transactions]
+    with atomic(db):
+        created_ids = db.scalars(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), rows
+        ).all()
+        deltas = [
+            daily_total_delta(
+                user_id, row["transaction_date"], row["category_id"], row["transaction_type"], row["amount"]
+            )
+            for row in rows
+        ]
+        apply_daily_total_deltas(db, deltas)
+        bump_transaction_versions(db, {user_id}, count_delta=len(rows))
+        invalidate_balance_checkpoints(db, deltas)
+    return list(created_ids)
+
+
+def update_transaction(db: Session, transaction_id: int, user_id: int, transaction: TransactionCreate):
+    """ユーザー自身のトランザクションを更新（UPDATE ... RETURNING、対象がない場合はNone）"""
+    with atomic(db):
+        # 日次集計の差分計算のため更新前の値も取得（他の更新とぶつからないよう行ロック）
+        previous = (
+            select(*TRANSACTION_COLUMNS)
+            .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+            .with_for_update()
+            .subquery("previous")
+        )
+        values = transaction.model_dump()
+
+        if db.get_bind().dialect.name == "postgresql":
+            # UPDATE ... FROM で更新前の値を同じ文で取得
+            updated = db.execute(
+                update(Transaction)
+                .where(Transaction.id == previous.c.id)
+                .values(**values)
+                .returning(*TRANSACTION_COLUMNS, *[column.label(f"previous_{column.key}") for column in previous.c])
+                .execution_options(synchronize_session=False)
+            ).one_or_none()
+            if updated is None:
+                return None
+            before = {column.key: updated._mapping[f"previous_{column.key}"] for column in previous.c}
+        else:
+            # SQLiteはRETURNINGでFROM句のテーブルを参照できないため先に取得
+            before = db.execute(select(previous)).mappings().one_or_none()
+            if before is None:
+                return None
+            updated = db.execute(
+                update(Transaction)
+                .where(Transaction.id == transaction_id)
+                .values(**values)
+                .returning(*TRANSACTION_COLUMNS)
+                .execution_options(synchronize_session=False)
+            ).one()
+
+        # 更新前の分を日次集計から取り消し、更新後の分を加算（日付・カテゴリー・金額の変更に対応）
+        deltas = [
+            daily_total_delta(
+                before["user_id"], before["transaction_date"], before["category_id"],
+                before["transaction_type"], before["amount"], sign=-1
+            ),
+            _daily_total_delta(updated),
+        ]
+        apply_daily_total_deltas(db, deltas)
+        bump_transaction_versions(db, {user_id})
+        # 変更前・変更後の日付のうち早い方より後の月初残高が変わる
+        invalidate_balance_checkpoints(db, deltas)
+    return updated
+
+
+def delete_transaction(db: Session, transaction_id: int, user_id: int):
+    """ユーザー自身のトランザクションを削除（DELETE ... RETURNING、対象がない場合はNone）"""
+    with atomic(db):
+        deleted = db.execute(
+            delete(Transaction)
+            .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+            .returning(*TRANSACTION_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+        if deleted is not None:
+            deltas = [_daily_total_delta(deleted, sign=-1)]
+            apply_daily_total_deltas(db, deltas)
+            bump_transaction_versions(db, {user_id}, count_delta=-1)
+            invalidate_balance_checkpoints(db, deltas)
+    return deleted
@@ -0,0 +1,158 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import case, delete, func, insert, or_, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app.crud.transaction_daily_total import daily_totals, truncate_date
+from app.crud.user_transaction_stats import user_transaction_stats
+from app.models.transaction import TransactionType
+from app.models.transaction_balance_checkpoint import TransactionBalanceCheckpoint
+from app.models.types import MinorUnits
+
+checkpoints = TransactionBalanceCheckpoint.__table__
+
+# 日次集計1行分の残高への寄与（収入は加算、支出は減算）
+_signed_amount = case(
+    (daily_totals.c.transaction_type == TransactionType.income, daily_totals.c.total_amount),
+    else_=-daily_totals.c.total_amount
+)
+
+
+def _next_month(month_start: date) -> date:
+    if month_start.month == 12:
+        return date(month_start.year + 1, 1, 1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def invalidate_balance_checkpoints(db: Session, deltas: list[dict]):
+    """日次集計の差分（daily_total_delta）の日付より後のチェックポイントを削除
+
+    同時に実行されるrefresh_balance_checkpointsと競合しないよう、バージョンの更新
+    （bump_transaction_versions）の後に呼ぶ。コミットは呼び出し側のトランザクションで行う
+    """
+    earliest: dict[int, date] = {}
+    for delta in deltas:
+        user_id, transaction_date = delta["user_id"], delta["date"]
+        if user_id not in earliest or transaction_date < earliest[user_id]:
+            earliest[user_id] = transaction_date
+    if not earliest:
+        return
+
+    db.execute(
+        delete(checkpoints).where(or_(*(
+            (checkpoints.c.user_id == user_id) & (checkpoints.c.month_start > transaction_date)
+            for user_id, transaction_date in earliest.items()
+        )))
+    )
+
+
+def refresh_balance_checkpoints(db: Session, user_id: int | None = None, today: date | None = None) -> int:
+    """当月初までの月初チェックポイントを作成し、作成件数を返す（user_id指定時はそのユーザーのみ）
+
+    最新のチェックポイントより後の日次集計だけを月ごとに集計して累計する
+    """
+    current_month = (today or date.today()).replace(day=1)
+    if user_id is None:
+        user_ids = db.scalars(select(daily_totals.c.user_id).distinct().order_by(daily_totals.c.user_id)).all()
+    else:
+        user_ids = [user_id]
+
+    created = 0
+    for target_user_id in user_ids:
+        # 書き込みはバージョンの行をロックするため、同じ行をロックして書き込み途中の集計から作らない
+        db.execute(
+            select(user_transaction_stats.c.user_id)
+            .where(user_transaction_stats.c.user_id == target_user_id)
+            .with_for_update()
+        )
+        latest = db.execute(
+            select(checkpoints.c.month_start, checkpoints.c.balance)
+            .where(checkpoints.c.user_id == target_user_id)
+            .order_by(checkpoints.c.month_start.desc())
+            .limit(1)
+        ).one_or_none()
+
+        month = truncate_date(db, "month", daily_totals.c.date).label("month")
+        monthly_query = (
+            select(month, func.sum(_signed_amount))
+            .where(daily_totals.c.user_id == target_user_id, daily_totals.c.date < current_month)
+            .group_by(month)
+            .order_by(month)
+        )
+        if latest is not None:
+            monthly_query = monthly_query.where(daily_totals.c.date >= latest.month_start)
+        monthly_nets = dict(db.execute(monthly_query).all())
+
+        if latest is not None:
+            month_start, balance = latest.month_start, Decimal(str(latest.balance))
+        elif monthly_nets:
+            month_start, balance = min(monthly_nets), Decimal(0)
+        else:
+            continue
+
+        rows = []
+        while month_start < current_month:
+            balance += Decimal(str(monthly_nets.get(month_start, 0)))
+            month_start = _next_month(month_start)
+            rows.append({"user_id": target_user_id, "month_start": month_start, "balance": balance})
+        if rows:
+            db.execute(insert(checkpoints), rows)
+            created += len(rows)
+        db.commit()
+    return created
+
+
+def get_daily_balances(db: Session, user_id: int, start_date: date | None = None, end_date: date | None = None):
+    """トランザクションがある日ごとの収入・支出と、その日の終わり時点の累計残高
+
+    start_date以前で最も近いチェックポイントから先の日次集計だけをウィンドウ関数で累計する
+    （チェックポイントがなければ最初から）
+    """
+    opening_balance = 0
+    daily_filters = [daily_totals.c.user_id == user_id]
+    if start_date:
+        nearest = (
+            select(checkpoints.c.month_start, checkpoints.c.balance)
+            .where(checkpoints.c.user_id == user_id, checkpoints.c.month_start <= start_date)
+            .order_by(checkpoints.c.month_start.desc())
+            .limit(1)
+            .subquery("nearest")
+        )
+        opening_balance = func.coalesce(select(nearest.c.balance).scalar_subquery(), 0)
+        scan_start = select(nearest.c.month_start).scalar_subquery()
+        daily_filters.append(or_(scan_start.is_(None), daily_totals.c.date >= scan_start))
+    if end_date:
+        daily_filters.append(daily_totals.c.date <= end_date)
+
+    daily = (
+        select(
+            daily_totals.c.date.label("transaction_date"),
+            func.sum(case(
+                (daily_totals.c.transaction_type == TransactionType.income, daily_totals.c.total_amount), else_=0
+            )).label("income"),
+            func.sum(case(
+                (daily_totals.c.transaction_type == TransactionType.expense, daily_totals.c.total_amount), else_=0
+            )).label("expense"),
+            func.sum(_signed_amount).label("net"),
+        )
+        .where(*daily_filters)
+        .group_by(daily_totals.c.date)
+        .subquery("daily")
+    )
+
+    running = select(
+        daily.c.transaction_date,
+        daily.c.income,
+        daily.c.expense,
+        # 整数との加算では型が失われるため、補助単位から金額への変換を明示
+        type_coerce(
+            opening_balance + func.sum(daily.c.net).over(order_by=daily.c.transaction_date), MinorUnits
+        ).label("balance"),
+    ).subquery("running")
+
+    # チェックポイントから開始日の前日までの分は残高にだけ反映し、行としては返さない
+    query = select(running)
+    if start_date:
+        query = query.where(running.c.transaction_date >= start_date)
+    return db.execute(query.order_by(running.c.transaction_date)).all()
@@ -0,0 +1,177 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, cast, delete, func, insert, literal, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.crud.user_transaction_stats import user_transaction_stats
+from app.models.transaction import Transaction
+from app.models.transaction_balance_checkpoint import TransactionBalanceCheckpoint
+from app.models.transaction_daily_total import TransactionDailyTotal, UNCATEGORIZED_ID
+from app.models.types import MINOR_UNIT_SCALE, to_minor_units
+
+daily_totals = TransactionDailyTotal.__table__
+
+
+def truncate_date(db: Session, period: str, column):
+    """集計期間の開始日を求めるSQL式（day/week/month/year、週は月曜始まり）"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc(period, column), Date)
+
+    # SQLiteにはdate_truncがないため日付修飾子で代替
+    modifiers = {
+        "day": [],
+        "week": ["weekday 0", "-6 days"],
+        "month": ["start of month"],
+        "year": ["start of year"],
+    }
+    return type_coerce(func.date(column, *modifiers[period]), Date)
+
+
+def _upsert_statement(db: Session):
+    """日次集計に差分を加算するUPSERT文（PostgreSQL・SQLiteのON CONFLICT）"""
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(daily_totals)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            daily_totals.c.user_id,
+            daily_totals.c.date,
+            daily_totals.c.category_id,
+            daily_totals.c.transaction_type,
+        ],
+        set_={
+            "total_amount": daily_totals.c.total_amount + stmt.excluded.total_amount,
+            "transaction_count": daily_totals.c.transaction_count + stmt.excluded.transaction_count,
+        }
+    )
+
+
+def daily_total_delta(
+    user_id: int,
+    transaction_date: date,
+    category_id: int | None,
+    transaction_type: str,
+    amount,
+    sign: int = 1
+) -> dict:
+    """1件のトランザクションが日次集計に与える差分（sign=-1で取り消し）
+
+    金額はトランザクションの保存時と同じく1件ずつ補助単位の整数に丸める
+    （まとめてから丸めると、保存されたトランザクションの合計と一致しなくなる）
+    """
+    return {
+        "user_id": user_id,
+        "date": transaction_date,
+        "category_id": UNCATEGORIZED_ID if category_id is None else category_id,
+        "transaction_type": transaction_type,
+        "total_amount_minor": sign * to_minor_units(amount),
+        "transaction_count": sign,
+    }
+
+
+def apply_daily_total_deltas(db: Session, deltas: list[dict]):
+    """日次集計に差分を反映（コミットは呼び出し側のトランザクションで行う）"""
+    # 同じキーの差分をまとめ、打ち消し合うものは送らない
+    merged = defaultdict(lambda: [0, 0])
+    for delta in deltas:
+        key = (delta["user_id"], delta["date"], delta["category_id"], delta["transaction_type"])
+        merged[key][0] += delta["total_amount_minor"]
+        merged[key][1] += delta["transaction_count"]
+
+    rows = [
+        {
+            "user_id": user_id,
+            "date": transaction_date,
+            "category_id": category_id,
+            "transaction_type": transaction_type,
+            # 補助単位の整数を割り切れる金額に戻す（MinorUnitsで同じ整数として保存される）
+            "total_amount": Decimal(total_minor) / MINOR_UNIT_SCALE,
+            "transaction_count": transaction_count,
+        }
+        for (user_id, transaction_date, category_id, transaction_type), (total_minor, transaction_count)
+        in merged.items()
+        if total_minor != 0 or transaction_count != 0
+    ]
+    if not rows:
+        return
+
+    db.execute(_upsert_statement(db), rows)
+
+    # 件数が0になった集計行は削除
+    if any(row["transaction_count"] < 0 for row in rows):
+        user_ids = {row["user_id"] for row in rows}
+        db.execute(
+            delete(daily_totals).where(
+                daily_totals.c.user_id.in_(user_ids),
+                daily_totals.c.transaction_count <= 0
+            )
+        )
+
+
+def move_category_to_uncategorized(db: Session, category_id: int):
+    """カテゴリー削除時に、そのカテゴリーの日次集計をカテゴリーなしへ移動"""
+    rows = db.execute(select(daily_totals).where(daily_totals.c.category_id == category_id)).all()
+    if not rows:
+        return
+
+    # 行のキーは列名（total_amount_minor）のため、INSERTのパラメーター名（列のkey）に合わせる
+    keys = daily_totals.c.keys()
+    db.execute(_upsert_statement(db), [{**dict(zip(keys, row)), "category_id": UNCATEGORIZED_ID} for row in rows])
+    db.execute(delete(daily_totals).where(daily_totals.c.category_id == category_id))
+
+
+def rebuild_daily_totals(db: Session, user_id: int | None = None):
+    """トランザクションから日次集計を作り直す（user_id指定時はそのユーザーのみ）
+
+    ユーザーごとのトランザクション件数も数え直し、日次集計から作る月初残高のチェックポイントは
+    削除する（refresh_balance_checkpointsで作り直す）
+    """
+    delete_stmt = delete(daily_totals)
+    delete_checkpoints_stmt = delete(TransactionBalanceCheckpoint)
+    update_counts_stmt = update(user_transaction_stats).values(
+        transaction_count=select(func.count())
+        .where(Transaction.user_id == user_transaction_stats.c.user_id)
+        .scalar_subquery()
+    )
+    # 集計行のないユーザー（一括投入したデータなど）は件数を持つ行を作成
+    missing_stats = select(Transaction.user_id, literal(1), func.count()).where(
+        ~select(user_transaction_stats.c.user_id)
+        .where(user_transaction_stats.c.user_id == Transaction.user_id)
+        .exists()
+    ).group_by(Transaction.user_id)
+    source = select(
+        Transaction.user_id,
+        Transaction.transaction_date,
+        func.coalesce(Transaction.category_id, UNCATEGORIZED_ID),
+        Transaction.transaction_type,
+        func.sum(Transaction.amount),
+        func.count(),
+    ).group_by(
+        Transaction.user_id,
+        Transaction.transaction_date,
+        func.coalesce(Transaction.category_id, UNCATEGORIZED_ID),
+        Transaction.transaction_type,
+    )
+
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(daily_totals.c.user_id == user_id)
+        delete_checkpoints_stmt = delete_checkpoints_stmt.where(TransactionBalanceCheckpoint.user_id == user_id)
+        update_counts_stmt = update_counts_stmt.where(user_transaction_stats.c.user_id == user_id)
+        missing_stats = missing_stats.where(Transaction.user_id == user_id)
+        source = source.where(Transaction.user_id == user_id)
+
+    db.execute(delete_stmt)
+    db.execute(delete_checkpoints_stmt)
+    db.execute(update_counts_stmt)
+    db.execute(
+        insert(user_transaction_stats).from_select(["user_id", "version", "transaction_count"], missing_stats)
+    )
+    db.execute(
+        insert(daily_totals).from_select(
+            ["user_id", "date", "category_id", "transaction_type", "total_amount", "transaction_count"],
+            source
+        )
+    )
+    db.commit()
@@ -1,5 +1,7 @@
+from sqlalchemy import func, insert, text, update
 from sqlalchemy.orm import Session
 
+from app.database import atomic
 from app.models.user import User
 from app.schemas.user import UserCreate
 
@@ -24,22 +26,39 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(User).offset(skip).limit(limit).all()
 
 
+def count_users(db: Session, exact: bool = False) -> int:
+    """ユーザー数（exact=FalseのPostgreSQLではCOUNT(*)せずプランナーの推定行数を使う）"""
+    if not exact and db.get_bind().dialect.name == "postgresql":
+        estimate = db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": User.__tablename__}
+        )
+        # 一度もANALYZEされていない場合は-1（古いバージョンでは0）になるため数える
+        if estimate is not None and estimate > 0:
+            return estimate
+    return db.query(func.count(User.id)).scalar()
+
+
 def create_user(db: Session, user: UserCreate):
-    """ユーザーを作成"""
-    db_user = User(**user.model_dump())
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    """ユーザーを作成（INSERT ... RETURNINGで作成後の行を取得）"""
+    with atomic(db):
+        db_user = db.execute(
+            insert(User).values(**user.model_dump()).returning(*User.__table__.columns)
+        ).one()
     return db_user
 
 
-def update_user(db: Session, db_user: User, user: UserCreate):
-    """ユーザーを更新"""
-    for key, value in user.model_dump().items():
-        setattr(db_user, key, value)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+def update_user(db: Session, user_id: int, user: UserCreate):
+    """ユーザーを更新（UPDATE ... RETURNINGで更新後の行を取得、存在しない場合はNone）"""
+    with atomic(db):
+        updated = db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(**user.model_dump())
+            .returning(*User.__table__.columns)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+    return updated
 
 
 def delete_user(db: Session, db_user: User):
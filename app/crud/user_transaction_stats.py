@@ -0,0 +1,51 @@
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+from app.models.user_transaction_stats import UserTransactionStats
+
+user_transaction_stats = UserTransactionStats.__table__
+
+
+def get_transaction_stats(db: Session, user_id: int) -> tuple[int, int]:
+    """ユーザーのトランザクションのバージョンと件数（まだ書き込みがない場合は0, 0）"""
+    row = db.execute(
+        select(user_transaction_stats.c.version, user_transaction_stats.c.transaction_count)
+        .where(user_transaction_stats.c.user_id == user_id)
+    ).one_or_none()
+    if row is None:
+        return 0, 0
+    return row.version, row.transaction_count
+
+
+def bump_transaction_versions(db: Session, user_ids: set[int], count_delta: int = 0):
+    """ユーザーのトランザクションのバージョンを進め、件数に count_delta を加える
+
+    コミットは呼び出し側のトランザクションで行う
+    """
+    if not user_ids:
+        return
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(user_transaction_stats)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[user_transaction_stats.c.user_id],
+            set_={
+                "version": user_transaction_stats.c.version + 1,
+                "transaction_count": user_transaction_stats.c.transaction_count + stmt.excluded.transaction_count,
+            }
+        ),
+        [{"user_id": user_id, "version": 1, "transaction_count": count_delta} for user_id in sorted(user_ids)]
+    )
+
+
+def bump_transaction_versions_for_category(db: Session, category_id: int):
+    """カテゴリーを使っているトランザクションを持つユーザーのバージョンを進める（カテゴリー削除時）"""
+    db.execute(
+        update(user_transaction_stats)
+        .where(user_transaction_stats.c.user_id.in_(
+            select(Transaction.user_id).where(Transaction.category_id == category_id).distinct()
+        ))
+        .values(version=user_transaction_stats.c.version + 1)
+    )
@@ -1,26 +1,264 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import math
+import re
+import time
+from collections.abc import AsyncIterator
+from contextlib import contextmanager
+from itertools import count
+
+from fastapi import Depends, Request
+from sqlalchemy import Engine, Select, create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from .config import settings
+from .metrics import enable_query_metrics
+from .pool import instrument_pool, pool_options
 
 # エンジン作成
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,  # SQLログ出力（開発時）
-    pool_pre_ping=True    # 接続確認
+    **pool_options(settings.DATABASE_URL)
 )
+instrument_pool("sync", engine)
+enable_query_metrics(engine)
+
+
+def enable_sqlite_foreign_keys(engine: Engine):
+    """SQLiteで外部キー制約を有効化（PostgreSQLでは何もしない）"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+enable_sqlite_foreign_keys(engine)
 
 # セッションファクトリー
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期モード用のドライバー
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str | URL) -> URL:
+    """同期ドライバーのURLを非同期ドライバーのURLに変換"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+# 非同期エンジン・セッションファクトリー（DATABASE_ASYNC=Trueの場合のみ）
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    async_url = to_async_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(
+        async_url,
+        echo=settings.DEBUG,
+        **pool_options(async_url)
+    )
+    instrument_pool("async", async_engine.sync_engine)
+    enable_query_metrics(async_engine.sync_engine)
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    # コミット後にレスポンスを組み立てる際の遅延ロード（I/O）を避けるためexpire_on_commit=False
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _read_urls() -> list[str]:
+    if not settings.DATABASE_READ_URL:
+        return []
+    return [url.strip() for url in settings.DATABASE_READ_URL.split(",") if url.strip()]
+
+
+# リードレプリカのセッションファクトリー（DATABASE_READ_URLの指定順、同期・非同期はプライマリと同じ）
+read_session_factories: list[sessionmaker | async_sessionmaker] = []
+for _index, _read_url in enumerate(_read_urls()):
+    if settings.DATABASE_ASYNC:
+        _async_read_url = to_async_url(_read_url)
+        _async_read_engine = create_async_engine(_async_read_url, echo=settings.DEBUG, **pool_options(_async_read_url))
+        _read_engine = _async_read_engine.sync_engine
+        read_session_factories.append(
+            async_sessionmaker(_async_read_engine, autoflush=False, expire_on_commit=False)
+        )
+    else:
+        _read_engine = create_engine(_read_url, echo=settings.DEBUG, **pool_options(_read_url))
+        read_session_factories.append(sessionmaker(autocommit=False, autoflush=False, bind=_read_engine))
+    enable_sqlite_foreign_keys(_read_engine)
+    instrument_pool(f"read{_index}", _read_engine)
+    enable_query_metrics(_read_engine)
+
+# ルーターで受け取るセッションの型（同期・非同期どちらか）
+AnySession = Session | AsyncSession
+
 # ベースクラス
 Base = declarative_base()
 
 
+def is_foreign_key_violation(exc: IntegrityError, column: str) -> bool:
+    """IntegrityErrorが指定カラムの外部キー制約違反か
+
+    PostgreSQLは制約名（例: transactions_category_id_fkey）で判定する。
+    SQLiteはどの制約かを返さないため、外部キー制約違反であればTrueとする
+    """
+    message = str(exc.orig)
+    if "FOREIGN KEY constraint failed" in message:
+        return True
+    match = re.search(r'violates foreign key constraint "([^"]+)"', message)
+    return match is not None and column in match.group(1)
+
+
+def is_unique_violation(exc: IntegrityError, column: str) -> bool:
+    """IntegrityErrorが指定カラムの一意制約違反か
+
+    PostgreSQLは制約・インデックス名（例: ix_users_email）、SQLiteはカラム名（例: users.email）で判定する
+    """
+    message = str(exc.orig)
+    match = re.search(r'violates unique constraint "([^"]+)"|UNIQUE constraint failed: (\S+)', message)
+    return match is not None and column in (match.group(1) or match.group(2))
+
+
+@contextmanager
+def atomic(db: Session):
+    """ブロック内の書き込みをコミット（制約違反時はロールバックして呼び出し側に伝える）"""
+    try:
+        yield
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+
+
 # 依存性注入用のDB取得関数
-def get_db():
+async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+
+# 書き込み後にプライマリへ固定する期限（UNIX時刻）を保持するクッキー
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+# レプリカを順番に使うためのカウンター
+_read_counter = count()
+
+
+def _is_pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request, primary: AnySession = Depends(get_db)):
+    """参照系エンドポイント用のDB取得
+
+    リードレプリカがあれば順番に使う。レプリカがない場合と、直前に書き込んだ
+    クライアント（read-your-writes）はプライマリのセッションを使う
+    """
+    if not read_session_factories or _is_pinned_to_primary(request):
+        yield primary
+        return
+
+    factory = read_session_factories[next(_read_counter) % len(read_session_factories)]
+    if isinstance(factory, async_sessionmaker):
+        async with factory() as db:
+            yield db
+        return
+
+    db = factory()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+
+def read_only(endpoint):
+    """POSTなどでも参照のみのエンドポイント（ReadYourWritesMiddlewareでプライマリに固定しない）"""
+    endpoint.read_only = True
+    return endpoint
+
+
+class ReadYourWritesMiddleware:
+    """書き込みに成功したクライアントの参照を一定時間プライマリに固定するASGIミドルウェア
+
+    レプリカの遅延で直前の書き込みが見えなくなるのを防ぐ。read_onlyのエンドポイントは除く
+    """
+
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        seconds = settings.READ_YOUR_WRITES_SECONDS
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.WRITE_METHODS
+            or not read_session_factories
+            or seconds <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            # ルーティング後はscopeに処理したエンドポイントが入っている
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and not getattr(scope.get("endpoint"), "read_only", False)
+            ):
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={time.time() + seconds:.3f}; "
+                    f"Max-Age={math.ceil(seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def run_db(db: AnySession, fn, /, *args, **kwargs):
+    """CRUD関数を実行
+
+    非同期セッションではAsyncSession.run_syncで非同期ドライバー上で実行し、
+    同期セッションではイベントループを塞がないようスレッドプールで実行する
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def stream_partitions(db: AnySession, stmt: Select, batch_size: int = 1000) -> AsyncIterator[list]:
+    """SELECT結果をサーバーサイドカーソルからバッチごとに取得"""
+    if isinstance(db, AsyncSession):
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+        return
+
+    def _partitions():
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
+    async for partition in iterate_in_threadpool(_partitions()):
+        yield partition
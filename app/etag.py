@@ -0,0 +1,21 @@
+from fastapi import Response, status
+
+
+def weak_etag(*parts) -> str:
+    """バージョン等から弱いETagを作成"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Matchが現在のETagと一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """304 Not Modified（本文なし）"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from datetime import date, datetime
+
+from sqlalchemy import Row
+
+# エクスポートの列順（CSVヘッダー・NDJSONのキー）
+EXPORT_FIELDS = [
+    "id",
+    "user_id",
+    "category_id",
+    "amount",
+    "transaction_type",
+    "description",
+    "transaction_date",
+    "created_at",
+    "updated_at",
+]
+
+
+# JSONにそのまま載らない列の変換
+_CONVERTERS = {
+    "amount": float,
+    "transaction_type": lambda value: value.value,
+    "transaction_date": date.isoformat,
+    "created_at": datetime.isoformat,
+    "updated_at": datetime.isoformat,
+}
+
+
+def _row_to_dict(row: Row, fields: list[str] = EXPORT_FIELDS) -> dict:
+    """Core行をJSON用の辞書に変換（Pydanticモデルは経由しない）"""
+    result = {}
+    for field in fields:
+        value = getattr(row, field)
+        converter = _CONVERTERS.get(field)
+        result[field] = value if converter is None or value is None else converter(value)
+    return result
+
+
+async def ndjson_chunks(batches: AsyncIterable[list[Row]], fields: list[str] = EXPORT_FIELDS) -> AsyncIterator[str]:
+    """行バッチをNDJSON文字列に変換（1バッチ1チャンク）"""
+    async for batch in batches:
+        yield "".join(json.dumps(_row_to_dict(row, fields), ensure_ascii=False) + "\n" for row in batch)
+
+
+async def csv_chunks(batches: AsyncIterable[list[Row]], fields: list[str] = EXPORT_FIELDS) -> AsyncIterator[str]:
+    """行バッチをCSV文字列に変換（先頭にヘッダー行、1バッチ1チャンク）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_row_to_dict(row, fields).values() for row in batch)
+        yield buffer.getvalue()
@@ -1,13 +1,38 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import SQLAlchemyError
 
 from .config import settings
+from .crud import category as crud_category
+from .database import ReadYourWritesMiddleware, get_db, run_db
+from .metrics import MetricsMiddleware, render_metrics
+from .pool import pool_status
 from .routers import users, categories, transactions
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 起動時にカテゴリーキャッシュを読み込み（失敗しても初回参照時に読み込む）
+    if settings.CATEGORY_CACHE_PRELOAD:
+        try:
+            async for db in get_db():
+                await run_db(db, crud_category.load_category_cache)
+        except SQLAlchemyError:
+            logger.warning("Failed to preload category cache", exc_info=True)
+    yield
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -17,7 +42,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
+# ルートごとのレイテンシ・SQL発行数の計測
+app.add_middleware(MetricsMiddleware)
+# 書き込み直後の参照をプライマリに固定（リードレプリカ使用時）
+app.add_middleware(ReadYourWritesMiddleware)
 
 # ルーター登録
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
@@ -33,3 +63,15 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/pool")
+async def pool_health():
+    """コネクションプールの使用状況"""
+    return pool_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus形式のメトリクス"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
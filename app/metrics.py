@@ -0,0 +1,184 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import Engine, event
+
+from .pool import pool_status
+
+# レイテンシのバケット（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 1リクエストあたりのSQL発行数のバケット
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Prometheusのヒストグラム（ラベルの組み合わせごとに集計）"""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = Lock()
+        # ラベル値 -> [バケットごとの件数（累積ではない、末尾は+Inf）, 合計, 件数]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> list[str]:
+        """テキスト形式の行を返す"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            label_text = _format_labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                bucket_labels = f'{label_text},le="{le}"' if label_text else f'le="{le}"'
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Number of SQL statements executed per HTTP request",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Total time spent in SQL statements per HTTP request",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION)
+
+
+class QueryStats:
+    """1リクエスト中に発行されたSQLの件数と合計時間"""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# 処理中のリクエストのSQL集計（スレッドプール・run_syncにも引き継がれる）
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def enable_query_metrics(engine: Engine):
+    """エンジンで実行されたSQLを処理中のリクエストに計上"""
+
+    # 開始時刻は文ごとの実行コンテキストに持たせる（例外で終わった文の分が接続に残らないように）
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_query_stats.get() is not None and context is not None:
+            context._query_start_time = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+        start_time = getattr(context, "_query_start_time", None)
+        if stats is not None and start_time is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - start_time
+
+
+def _route_template(scope) -> str:
+    """マッチしたルートのテンプレート（include_routerのprefixを含む）"""
+    # 新しいFastAPIではinclude_routerしたルートのpathにprefixが含まれないため、解決済みのpathを優先
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ルートテンプレートごとのレイテンシとSQL発行数・時間を記録するASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_query_stats.reset(token)
+            # パスパラメーターで系列が増えないよう、マッチしたルートのテンプレートで集計
+            route_path = _route_template(scope)
+            method = scope["method"]
+            REQUEST_DURATION.observe((method, route_path, str(status_code)), elapsed)
+            REQUEST_DB_QUERIES.observe((method, route_path), stats.count)
+            REQUEST_DB_DURATION.observe((method, route_path), stats.seconds)
+
+
+def render_metrics() -> str:
+    """Prometheusのテキスト形式で出力"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+
+    pools = pool_status()
+    for metric, key, metric_type, documentation in [
+        ("db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out"),
+        ("db_pool_overflow", "overflow", "gauge", "Overflow connections in use"),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Total connection checkouts"),
+        ("db_pool_invalidations_total", "invalidations", "counter", "Total invalidated connections"),
+        ("db_pool_checkout_wait_seconds_total", "checkout_wait_seconds_total", "counter", "Total time spent waiting for a connection"),
+    ]:
+        lines.append(f"# HELP {metric} {documentation}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for pool_name, values in pools.items():
+            if values[key] is not None:
+                lines.append(f'{metric}{{pool="{pool_name}"}} {values[key]}')
+    return "\n".join(lines) + "\n"
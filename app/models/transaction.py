@@ -1,10 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 import enum
 
 from app.database import Base
+from app.models.types import MinorUnits
+from app.search import install_search_ddl
 
 
 class TransactionType(str, enum.Enum):
@@ -18,7 +20,8 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True, index=True)
-    amount = Column(Numeric(10, 2), nullable=False)
+    # 補助単位の整数で保存（amount_minor列）
+    amount = Column("amount_minor", MinorUnits, key="amount", nullable=False)
     transaction_type: TransactionType = Column(SQLEnum(TransactionType), nullable=False)  # type: ignore
     description = Column(String(255), nullable=True)
     transaction_date = Column(Date, nullable=False, index=True)
@@ -29,5 +32,14 @@ class Transaction(Base):
     user = relationship("User", backref="transactions")
     category = relationship("Category", backref="transactions")
 
+    __table_args__ = (
+        # 一覧取得のキーセットページング用（user_id絞り込み + 日付降順 + id降順）
+        Index("ix_transactions_user_id_transaction_date_id", user_id, transaction_date.desc(), id.desc()),
+    )
+
     def __repr__(self):
         return f"<Transaction(id={self.id}, amount={self.amount}, type={self.transaction_type}, user_id={self.user_id})>"
+
+
+# descriptionの全文検索用（PostgreSQLはpg_trgmのGINインデックス、SQLiteはFTS5）
+install_search_ddl(Transaction.__table__)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer
+
+from app.database import Base
+from app.models.types import MinorUnits
+
+
+class TransactionBalanceCheckpoint(Base):
+    """月初時点のユーザーの累計残高（収入 - 支出）
+
+    month_start より前のトランザクションの合計。それ以前の日付への書き込みで無効になり削除される
+    """
+    __tablename__ = "transaction_balance_checkpoints"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month_start = Column(Date, primary_key=True)
+    # 補助単位の整数で保存（balance_minor列）
+    balance = Column("balance_minor", MinorUnits, key="balance", nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<TransactionBalanceCheckpoint(user_id={self.user_id}, month_start={self.month_start}, "
+            f"balance={self.balance})>"
+        )
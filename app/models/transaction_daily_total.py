@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Enum as SQLEnum
+
+from app.database import Base
+from app.models.transaction import TransactionType
+from app.models.types import MinorUnits
+
+# カテゴリーなしのトランザクションを集計する際のcategory_id（主キーにNULLを含められないため）
+UNCATEGORIZED_ID = 0
+
+
+class TransactionDailyTotal(Base):
+    """ユーザー・日付・カテゴリー・収支タイプごとの日次集計（トランザクション書き込み時に更新）"""
+    __tablename__ = "transaction_daily_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True, default=UNCATEGORIZED_ID)
+    transaction_type: TransactionType = Column(SQLEnum(TransactionType), primary_key=True)  # type: ignore
+    # 補助単位の整数で保存（total_amount_minor列）
+    total_amount = Column("total_amount_minor", MinorUnits, key="total_amount", nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<TransactionDailyTotal(user_id={self.user_id}, date={self.date}, category_id={self.category_id}, "
+            f"type={self.transaction_type}, total_amount={self.total_amount}, count={self.transaction_count})>"
+        )
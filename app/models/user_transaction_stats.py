@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+
+from app.database import Base
+
+
+class UserTransactionStats(Base):
+    """ユーザーごとのトランザクションの状態（トランザクション書き込み時に更新）"""
+    __tablename__ = "user_transaction_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # トランザクションが変更されるたびに増える番号（一覧のETagに使用）
+    version = Column(BigInteger, nullable=False, default=0)
+    # トランザクション件数（一覧の X-Total-Count に使用）
+    transaction_count = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<UserTransactionStats(user_id={self.user_id}, version={self.version}, "
+            f"transaction_count={self.transaction_count})>"
+        )
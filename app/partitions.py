@@ -0,0 +1,180 @@
+"""transactionsテーブルの範囲パーティション（PostgreSQLのみ）の管理
+
+transaction_date で月単位または年単位（TRANSACTION_PARTITION_INTERVAL）に分割する。
+範囲外の日付は transactions_default に入るため、将来分のパーティションを
+create_future_partitions で事前に作成しておく
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PARENT_TABLE = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: date
+    end: date
+
+
+def partition_start(day: date, interval: str) -> date:
+    """dayを含むパーティションの開始日"""
+    if interval == "year":
+        return date(day.year, 1, 1)
+    return day.replace(day=1)
+
+
+def shift_partition_start(start: date, interval: str, count: int = 1) -> date:
+    """count個後（負の値で前）のパーティションの開始日"""
+    if interval == "year":
+        return date(start.year + count, 1, 1)
+    months = start.year * 12 + start.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(start: date, interval: str) -> str:
+    if interval == "year":
+        return f"{PARENT_TABLE}_y{start.year}"
+    return f"{PARENT_TABLE}_y{start.year}m{start.month:02d}"
+
+
+def create_partition_sql(start: date, interval: str) -> str:
+    """start から始まるパーティションを作成するDDL（作成済みの場合は何もしない）"""
+    end = shift_partition_start(start, interval)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start, interval)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def _create_partition_from_default(db: Session, start: date, interval: str):
+    """デフォルトパーティションに入っている範囲内の行を移してからパーティションを作成
+
+    行が残ったまま PARTITION OF で作成するとデフォルトパーティションの制約違反になるため、
+    単独のテーブルに移してから ATTACH する（インデックス・外部キーはATTACH時に作成される）
+    """
+    name = partition_name(start, interval)
+    end = shift_partition_start(start, interval)
+    bounds = {"start": start, "end": end}
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE transaction_date >= :start "
+            f"AND transaction_date < :end RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds
+    )
+    db.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+
+def _default_has_rows(db: Session, start: date, interval: str) -> bool:
+    return db.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE transaction_date >= :start AND transaction_date < :end)"
+        ),
+        {"start": start, "end": shift_partition_start(start, interval)}
+    ).scalar()
+
+
+def is_partitioned(db: Session) -> bool:
+    """transactionsがパーティションテーブルか（PostgreSQL以外は常にFalse）"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+        ),
+        {"table": PARENT_TABLE}
+    ).scalar()
+
+
+def list_partitions(db: Session) -> list[Partition]:
+    """日付範囲のパーティション一覧（開始日順、デフォルトパーティションは含まない）"""
+    rows = db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table AND pg_table_is_visible(p.oid)"
+        ),
+        {"table": PARENT_TABLE}
+    ).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_PATTERN.search(bound)
+        if match is not None:
+            partitions.append(Partition(name, date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def _require_partitioned(db: Session):
+    if not is_partitioned(db):
+        raise RuntimeError(f"{PARENT_TABLE} is not a partitioned table (PostgreSQL with the partitioning migration applied)")
+
+
+def create_future_partitions(db: Session, ahead: int, interval: str, today: date | None = None) -> list[str]:
+    """今期から ahead 期先までのパーティションを作成し、新たに作成した名前を返す
+
+    デフォルトパーティションに該当期間の行があれば新しいパーティションへ移す
+    """
+    _require_partitioned(db)
+    existing = {partition.start for partition in list_partitions(db)}
+    start = partition_start(today or date.today(), interval)
+    created = []
+    for offset in range(ahead + 1):
+        partition = shift_partition_start(start, interval, offset)
+        if partition in existing:
+            continue
+        if _default_has_rows(db, partition, interval):
+            _create_partition_from_default(db, partition, interval)
+        else:
+            db.execute(text(create_partition_sql(partition, interval)))
+        created.append(partition_name(partition, interval))
+    db.commit()
+    return created
+
+
+def detach_old_partitions(
+    db: Session,
+    keep: int,
+    interval: str,
+    archive_schema: str | None = None,
+    drop: bool = False,
+    today: date | None = None
+) -> list[str]:
+    """今期より keep 期以上前のパーティションを切り離し、切り離した名前を返す
+
+    切り離したテーブルは archive_schema に移動するか、drop=True で削除する（どちらもなければそのまま残す）。
+    日次集計（transaction_daily_totals）は残すため、集計APIでは引き続き過去分を参照できる
+    """
+    _require_partitioned(db)
+    cutoff = shift_partition_start(partition_start(today or date.today(), interval), interval, -keep)
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    if archive_schema is not None:
+        db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {quote(archive_schema)}"))
+
+    detached = []
+    for partition in list_partitions(db):
+        if partition.end > cutoff:
+            continue
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {quote(partition.name)}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {quote(partition.name)}"))
+        elif archive_schema is not None:
+            db.execute(text(f"ALTER TABLE {quote(partition.name)} SET SCHEMA {quote(archive_schema)}"))
+        detached.append(partition.name)
+    db.commit()
+    return detached
@@ -0,0 +1,128 @@
+import time
+from threading import Lock
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .config import settings
+
+# 接続レコードのinfoに記録する、直近のチェックアウトの待ち時間
+_CHECKOUT_WAIT_KEY = "checkout_wait_seconds"
+
+
+class _CheckoutTimerMixin:
+    """プールから接続を取り出すまでの待ち時間（空き待ち・新規接続を含む）を記録"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        record = super()._do_get()
+        record.info[_CHECKOUT_WAIT_KEY] = time.perf_counter() - start
+        return record
+
+
+class TimedQueuePool(_CheckoutTimerMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_CheckoutTimerMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str | URL) -> dict:
+    """create_engine / create_async_engine に渡すプール設定
+
+    QueuePool以外（SQLiteのインメモリDBなど）ではサイズ関連の設定は使わない
+    """
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    pool_class = url.get_dialect().get_pool_class(url)
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if issubclass(pool_class, AsyncAdaptedQueuePool) else TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+class PoolStats:
+    """プールイベントから集計した累計値"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float | None):
+        with self._lock:
+            self.checkouts += 1
+            if wait_seconds is not None:
+                self.checkout_wait_seconds_total += wait_seconds
+                self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait_seconds)
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+# 名前 -> (エンジン, 統計)
+_pools: dict[str, tuple[Engine, PoolStats]] = {}
+
+
+def instrument_pool(name: str, engine: Engine) -> PoolStats:
+    """エンジンのプールにイベントを登録し、pool_status() の対象にする
+
+    エンジンに登録するため、dispose() でプールが作り直されても集計は続く。
+    切断エラー時はSQLAlchemyが接続（とプール全体）を無効化するため、その件数もここで数える
+    """
+    stats = PoolStats()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_checkout(connection_record.info.pop(_CHECKOUT_WAIT_KEY, None))
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("soft_invalidations")
+
+    _pools[name] = (engine, stats)
+    return stats
+
+
+def pool_status() -> dict[str, dict]:
+    """登録済みプールの現在値と累計値"""
+    status = {}
+    for name, (engine, stats) in _pools.items():
+        pool = engine.pool
+        is_queue_pool = isinstance(pool, QueuePool)
+        status[name] = {
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if is_queue_pool else None,
+            "checked_out": pool.checkedout() if is_queue_pool else None,
+            # pool_size未満の間は負の値になるため0に丸める
+            "overflow": max(pool.overflow(), 0) if is_queue_pool else None,
+            "connects": stats.connects,
+            "checkouts": stats.checkouts,
+            "invalidations": stats.invalidations,
+            "soft_invalidations": stats.soft_invalidations,
+            "checkout_wait_seconds_total": stats.checkout_wait_seconds_total,
+            "checkout_wait_seconds_max": stats.checkout_wait_seconds_max,
+        }
+    return status
@@ -1,24 +1,26 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 
+from app.config import settings
 from app.crud import category as crud_category
-from app.database import get_db
+from app.database import AnySession, get_db, get_read_db, run_db
+from app.etag import etag_matches, not_modified, weak_etag
 from app.schemas.category import CategoryCreate, CategoryResponse
+from app.serialization import json_list_response
 
 router = APIRouter()
 
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+async def create_category(category: CategoryCreate, db: AnySession = Depends(get_db)):
     # TODO: 認証実装後、管理者権限チェックを追加
-    return crud_category.create_category(db=db, category=category)
+    return await run_db(db, crud_category.create_category, category=category)
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    db_category = crud_category.get_category(db, category_id=category_id)
+async def get_category(category_id: int, db: AnySession = Depends(get_read_db)):
+    db_category = await run_db(db, crud_category.get_cached_category, category_id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -28,30 +30,50 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[CategoryResponse])
-def get_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud_category.get_categories(db, skip=skip, limit=limit)
+async def get_categories(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    total_count: str | None = Query(None, pattern="^(estimated|exact)$"),
+    if_none_match: str | None = Header(None),
+    db: AnySession = Depends(get_read_db)
+):
+    # 内容が変わっていなければ一覧を作らずに304を返す
+    etag = weak_etag("categories", await run_db(db, crud_category.get_categories_etag))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    # 件数は指定時のみ（全件キャッシュしているため estimated・exact とも正確な値）
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(await run_db(db, crud_category.count_categories))
+
+    db_categories = await run_db(db, crud_category.get_categories, skip=skip, limit=limit)
+    if settings.FAST_JSON_RESPONSES:
+        return json_list_response(CategoryResponse, db_categories, headers=dict(response.headers))
+    return db_categories
 
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-def update_category(category_id: int, category: CategoryCreate, db: Session = Depends(get_db)):
+async def update_category(category_id: int, category: CategoryCreate, db: AnySession = Depends(get_db)):
     # TODO: 認証実装後、管理者権限チェックを追加
-    db_category = crud_category.get_category(db, category_id=category_id)
+    db_category = await run_db(db, crud_category.get_category, category_id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    return crud_category.update_category(db=db, db_category=db_category, category=category)
+    return await run_db(db, crud_category.update_category, db_category=db_category, category=category)
 
 
 @router.delete("/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db)):
+async def delete_category(category_id: int, db: AnySession = Depends(get_db)):
     # TODO: 認証実装後、管理者権限チェックを追加
-    db_category = crud_category.get_category(db, category_id=category_id)
+    db_category = await run_db(db, crud_category.get_category, category_id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    crud_category.delete_category(db=db, db_category=db_category)
+    await run_db(db, crud_category.delete_category, db_category=db_category)
     return {"message": "Category deleted successfully"}
@@ -1,13 +1,42 @@
 from datetime import date
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 
+from app.config import settings
 from app.crud import transaction as crud_transaction
 from app.crud import category as crud_category
-from app.database import get_db
-from app.schemas.transaction import TransactionCreate, TransactionResponse
+from app.crud import transaction_balance_checkpoint as crud_transaction_balance_checkpoint
+from app.crud import user_transaction_stats as crud_user_transaction_stats
+from app.database import (
+    AnySession,
+    get_db,
+    get_read_db,
+    is_foreign_key_violation,
+    read_only,
+    run_db,
+    stream_partitions,
+)
+from app.etag import etag_matches, not_modified, weak_etag
+from app.export import EXPORT_FIELDS, csv_chunks, ndjson_chunks
+from app.search import MIN_QUERY_LENGTH
+from app.serialization import json_list_response, sparse_list_response
+from app.schemas.transaction import (
+    TransactionBalance,
+    TransactionBatchGet,
+    TransactionBatchGetItem,
+    TransactionBatchGetResult,
+    TransactionBulkCreate,
+    TransactionBulkError,
+    TransactionBulkResult,
+    TransactionCreate,
+    TransactionResponse,
+    TransactionSummaryBucket,
+    transaction_create_adapter,
+)
 
 router = APIRouter()
 
@@ -16,29 +45,216 @@ router = APIRouter()
 TEMP_USER_ID = 2
 
 
+def _raise_if_category_not_found(exc: IntegrityError, transaction: TransactionCreate):
+    """カテゴリーの外部キー制約違反を404に変換"""
+    if transaction.category_id is not None and is_foreign_key_violation(exc, "category_id"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+
+
+async def _raise_not_found_or_forbidden(db: AnySession, transaction_id: int, forbidden_detail: str):
+    """更新・削除の対象がなかった場合に、存在しないのか他人のものなのかを判定"""
+    db_transaction = await run_db(db, crud_transaction.get_transaction, transaction_id=transaction_id)
+    if not db_transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=forbidden_detail
+    )
+
+
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
-    # カテゴリーIDが指定されている場合、存在確認と所有者確認
-    if transaction.category_id is not None:
-        db_category = crud_category.get_category(db, category_id=transaction.category_id)
-        if not db_category:
+async def create_transaction(transaction: TransactionCreate, db: AnySession = Depends(get_db)):
+    # カテゴリーの存在は外部キー制約で確認
+    try:
+        return await run_db(db, crud_transaction.create_transaction, transaction=transaction, user_id=TEMP_USER_ID)
+    except IntegrityError as e:
+        _raise_if_category_not_found(e, transaction)
+        raise
+
+
+def _validation_error_detail(exc: ValidationError) -> str:
+    """検証エラーを1行のメッセージに変換（例: amount: Input should be greater than 0）"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+async def _split_bulk_items(db: AnySession, items: list[dict]):
+    """行ごとに検証し、参照されているカテゴリーIDをまとめて1クエリで存在確認して、作成する行とエラーに分ける"""
+    validated = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            validated.append((index, transaction_create_adapter.validate_python(item)))
+        except ValidationError as e:
+            errors.append(TransactionBulkError(index=index, detail=_validation_error_detail(e)))
+
+    requested_category_ids = {item.category_id for _, item in validated if item.category_id is not None}
+    existing_category_ids = await run_db(db, crud_category.get_existing_category_ids, requested_category_ids)
+
+    valid_items = []
+    for index, item in validated:
+        if item.category_id is not None and item.category_id not in existing_category_ids:
+            errors.append(TransactionBulkError(index=index, detail="Category not found"))
+        else:
+            valid_items.append(item)
+    errors.sort(key=lambda error: error.index)
+    return valid_items, errors
+
+
+@router.post("/bulk", response_model=TransactionBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_transactions_bulk(bulk: TransactionBulkCreate, db: AnySession = Depends(get_db)):
+    valid_items, errors = await _split_bulk_items(db, bulk.items)
+    while True:
+        # 部分成功を許可しない場合は1件でもエラーがあれば何も作成しない
+        if errors and not bulk.allow_partial:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=[error.model_dump() for error in errors]
             )
-        # TODO: 認証実装後、自分のカテゴリーかチェック
-        if db_category.user_id != TEMP_USER_ID:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to use this category"
+
+        try:
+            created_ids = await run_db(
+                db, crud_transaction.create_transactions, transactions=valid_items, user_id=TEMP_USER_ID
             )
+        except IntegrityError as e:
+            if not is_foreign_key_violation(e, "category_id"):
+                raise
+            # 確認後に他のリクエストでカテゴリーが削除された場合は確認し直す（減らなければ別の制約違反）
+            checked_count = len(valid_items)
+            valid_items, errors = await _split_bulk_items(db, bulk.items)
+            if len(valid_items) == checked_count:
+                raise
+            continue
+        return TransactionBulkResult(created_ids=created_ids, errors=errors)
 
-    return crud_transaction.create_transaction(db=db, transaction=transaction, user_id=TEMP_USER_ID)
+
+@router.post("/batch-get", response_model=TransactionBatchGetResult)
+@read_only
+async def get_transactions_batch(batch: TransactionBatchGet, db: AnySession = Depends(get_read_db)):
+    # IDごとに取得し直さず1クエリでまとめて取得し、見つからない・他人のものはIDごとに返す
+    owned, forbidden_ids = await run_db(
+        db, crud_transaction.get_transactions_by_ids, transaction_ids=batch.ids, user_id=TEMP_USER_ID
+    )
+    items = []
+    for transaction_id in batch.ids:
+        if transaction_id in owned:
+            items.append(TransactionBatchGetItem(
+                id=transaction_id,
+                status=status.HTTP_200_OK,
+                transaction=TransactionResponse.model_validate(owned[transaction_id])
+            ))
+        elif transaction_id in forbidden_ids:
+            items.append(TransactionBatchGetItem(
+                id=transaction_id,
+                status=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this transaction"
+            ))
+        else:
+            items.append(TransactionBatchGetItem(
+                id=transaction_id,
+                status=status.HTTP_404_NOT_FOUND,
+                detail="Transaction not found"
+            ))
+    return TransactionBatchGetResult(items=items)
+
+
+@router.get("/summary", response_model=List[TransactionSummaryBucket])
+async def get_transaction_summary(
+    period: str = Query("month", pattern="^(day|week|month|year)$"),
+    transaction_type: str | None = Query(None, pattern="^(income|expense)$"),
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    db: AnySession = Depends(get_read_db)
+):
+    return await run_db(
+        db,
+        crud_transaction.get_transaction_summary,
+        user_id=TEMP_USER_ID,
+        period=period,
+        transaction_type=transaction_type,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+
+@router.get("/balance", response_model=List[TransactionBalance])
+async def get_transaction_balance(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    db: AnySession = Depends(get_read_db)
+):
+    # トランザクションがある日ごとの累計残高（開始日より前の分も残高に含む）
+    return await run_db(
+        db,
+        crud_transaction_balance_checkpoint.get_daily_balances,
+        user_id=TEMP_USER_ID,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+
+def _parse_fields(fields: str | None) -> list[str] | None:
+    """fields= をレスポンスの列名リストに変換（重複は除去し、指定順を維持）"""
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    invalid = [name for name in names if name not in TransactionResponse.model_fields]
+    if not names or invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {', '.join(invalid) or fields}"
+        )
+    return names
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    transaction_type: str | None = Query(None, pattern="^(income|expense)$"),
+    category_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    fields: str | None = None,
+    db: AnySession = Depends(get_read_db)
+):
+    # 全件をメモリに載せず、サーバーサイドカーソルから逐次ストリーミング
+    selected_fields = _parse_fields(fields) or EXPORT_FIELDS
+    stmt = crud_transaction.export_statement(
+        user_id=TEMP_USER_ID,
+        transaction_type=transaction_type,
+        category_id=category_id,
+        start_date=start_date,
+        end_date=end_date,
+        fields=selected_fields
+    )
+    batches = stream_partitions(db, stmt)
+
+    if format == "csv":
+        return StreamingResponse(
+            csv_chunks(batches, selected_fields),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="transactions.csv"'}
+        )
+    return StreamingResponse(
+        ndjson_chunks(batches, selected_fields),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="transactions.ndjson"'}
+    )
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
-def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    db_transaction = crud_transaction.get_transaction(db, transaction_id=transaction_id)
+async def get_transaction(transaction_id: int, db: AnySession = Depends(get_read_db)):
+    db_transaction = await run_db(db, crud_transaction.get_transaction, transaction_id=transaction_id)
     if not db_transaction:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -56,76 +272,130 @@ def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[TransactionResponse])
-def get_transactions(
+async def get_transactions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     transaction_type: str | None = Query(None, pattern="^(income|expense)$"),
     category_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    db: Session = Depends(get_db)
+    cursor: str | None = None,
+    fields: str | None = None,
+    q: str | None = Query(None, min_length=MIN_QUERY_LENGTH, max_length=255),
+    total_count: str | None = Query(None, pattern="^(estimated|exact)$"),
+    if_none_match: str | None = Header(None),
+    db: AnySession = Depends(get_read_db)
 ):
-    return crud_transaction.get_transactions(
+    selected_fields = _parse_fields(fields)
+
+    # 全文検索（q）の結果は関連度順のため、キーセットページングではなくskip/limitでページング
+    if q is not None and cursor is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with q"
+        )
+
+    # カーソルが指定されている場合はキーセットページング
+    decoded_cursor = None
+    if cursor is not None:
+        try:
+            decoded_cursor = crud_transaction.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    # トランザクションが変わっていなければ行を読み込まずに304を返す
+    # （ETagはURLごとに比較されるため、バージョンだけでフィルター・ページごとに区別できる）
+    version, transaction_count = await run_db(
+        db, crud_user_transaction_stats.get_transaction_stats, user_id=TEMP_USER_ID
+    )
+    etag = weak_etag("transactions", TEMP_USER_ID, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    # 件数は指定時のみ（フィルターなしはバージョンと一緒に取得した件数、ありは日次集計から）
+    if total_count is not None:
+        filters = [transaction_type, category_id, start_date, end_date, q]
+        if total_count == "estimated" and all(value is None for value in filters):
+            total = transaction_count
+        else:
+            total = await run_db(
+                db,
+                crud_transaction.count_transactions,
+                user_id=TEMP_USER_ID,
+                transaction_type=transaction_type,
+                category_id=category_id,
+                start_date=start_date,
+                end_date=end_date,
+                q=q,
+                exact=total_count == "exact"
+            )
+        response.headers["X-Total-Count"] = str(total)
+
+    db_transactions = await run_db(
         db,
+        crud_transaction.get_transactions,
         user_id=TEMP_USER_ID,
         skip=skip,
         limit=limit,
         transaction_type=transaction_type,
         category_id=category_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        cursor=decoded_cursor,
+        fields=selected_fields,
+        q=q
     )
 
+    # 次ページがありうる場合は次のカーソルをヘッダーで返す
+    if q is None and limit > 0 and len(db_transactions) == limit:
+        last = db_transactions[-1]
+        response.headers["X-Next-Cursor"] = crud_transaction.encode_cursor(last.transaction_date, last.id)
 
-@router.put("/{transaction_id}", response_model=TransactionResponse)
-def update_transaction(transaction_id: int, transaction: TransactionCreate, db: Session = Depends(get_db)):
-    db_transaction = crud_transaction.get_transaction(db, transaction_id=transaction_id)
-    if not db_transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
+    # fields指定時は指定された列だけを返す（response_modelは経由しない）
+    if selected_fields is not None:
+        return sparse_list_response(db_transactions, selected_fields, headers=dict(response.headers))
+    if settings.FAST_JSON_RESPONSES:
+        return json_list_response(TransactionResponse, db_transactions, headers=dict(response.headers))
+    return db_transactions
 
+
+@router.put("/{transaction_id}", response_model=TransactionResponse)
+async def update_transaction(transaction_id: int, transaction: TransactionCreate, db: AnySession = Depends(get_db)):
     # TODO: 認証実装後、自分のトランザクションかチェック
-    if db_transaction.user_id != TEMP_USER_ID:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this transaction"
+    # 所有者で絞り込んだUPDATE 1文で更新し、対象がない場合のみ404/403を判定
+    # カテゴリーの存在は外部キー制約で確認
+    try:
+        db_transaction = await run_db(
+            db,
+            crud_transaction.update_transaction,
+            transaction_id=transaction_id,
+            user_id=TEMP_USER_ID,
+            transaction=transaction
         )
+    except IntegrityError as e:
+        _raise_if_category_not_found(e, transaction)
+        raise
 
-    # カテゴリーIDが指定されている場合、存在確認と所有者確認
-    if transaction.category_id is not None:
-        db_category = crud_category.get_category(db, category_id=transaction.category_id)
-        if not db_category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
-        # TODO: 認証実装後、自分のカテゴリーかチェック
-        if db_category.user_id != TEMP_USER_ID:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to use this category"
-            )
-
-    return crud_transaction.update_transaction(db=db, db_transaction=db_transaction, transaction=transaction)
+    if not db_transaction:
+        await _raise_not_found_or_forbidden(db, transaction_id, "Not authorized to update this transaction")
+    return db_transaction
 
 
 @router.delete("/{transaction_id}")
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    db_transaction = crud_transaction.get_transaction(db, transaction_id=transaction_id)
-    if not db_transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
-
+async def delete_transaction(transaction_id: int, db: AnySession = Depends(get_db)):
     # TODO: 認証実装後、自分のトランザクションかチェック
-    if db_transaction.user_id != TEMP_USER_ID:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this transaction"
-        )
-
-    crud_transaction.delete_transaction(db=db, db_transaction=db_transaction)
+    # 所有者で絞り込んだDELETE 1文で削除し、対象がない場合のみ404/403を判定
+    db_transaction = await run_db(
+        db,
+        crud_transaction.delete_transaction,
+        transaction_id=transaction_id,
+        user_id=TEMP_USER_ID
+    )
+    if not db_transaction:
+        await _raise_not_found_or_forbidden(db, transaction_id, "Not authorized to delete this transaction")
     return {"message": "Transaction deleted successfully"}
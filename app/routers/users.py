@@ -1,39 +1,44 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
 
+from app.config import settings
 from app.crud import user as crud_user
-from app.database import get_db
+from app.database import AnySession, get_db, get_read_db, is_unique_violation, run_db
 from app.schemas.user import UserCreate, UserResponse
+from app.serialization import json_list_response
 
 router = APIRouter()
 
 
-@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if email already exists
-    db_user = crud_user.get_user_by_email(db, email=user.email)
-    if db_user:
+def _raise_if_duplicate(exc: IntegrityError):
+    """一意制約違反を既存のエラーレスポンスに変換"""
+    if is_unique_violation(exc, "email"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-
-    # Check if username already exists
-    db_user = crud_user.get_user_by_username(db, username=user.username)
-    if db_user:
+    if is_unique_violation(exc, "username"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
 
-    return crud_user.create_user(db=db, user=user)
+
+@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def create_user(user: UserCreate, db: AnySession = Depends(get_db)):
+    # メールアドレス・ユーザー名の重複は一意制約で検出
+    try:
+        return await run_db(db, crud_user.create_user, user=user)
+    except IntegrityError as e:
+        _raise_if_duplicate(e)
+        raise
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user(db, user_id=user_id)
+async def get_user(user_id: int, db: AnySession = Depends(get_read_db)):
+    db_user = await run_db(db, crud_user.get_user, user_id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -43,48 +48,49 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[UserResponse])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud_user.get_users(db, skip=skip, limit=limit)
+async def get_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    total_count: str | None = Query(None, pattern="^(estimated|exact)$"),
+    db: AnySession = Depends(get_read_db)
+):
+    # 件数は指定時のみ（estimatedはPostgreSQLのプランナーの推定値）
+    if total_count is not None:
+        total = await run_db(db, crud_user.count_users, exact=total_count == "exact")
+        response.headers["X-Total-Count"] = str(total)
+
+    db_users = await run_db(db, crud_user.get_users, skip=skip, limit=limit)
+    if settings.FAST_JSON_RESPONSES:
+        return json_list_response(UserResponse, db_users, headers=dict(response.headers))
+    return db_users
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user(db, user_id=user_id)
+async def update_user(user_id: int, user: UserCreate, db: AnySession = Depends(get_db)):
+    # 他のユーザーとのメールアドレス・ユーザー名の重複は一意制約で検出
+    try:
+        db_user = await run_db(db, crud_user.update_user, user_id=user_id, user=user)
+    except IntegrityError as e:
+        _raise_if_duplicate(e)
+        raise
+
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-
-    # Check if email is taken by another user
-    if user.email != db_user.email:
-        existing_user = crud_user.get_user_by_email(db, email=user.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-
-    # Check if username is taken by another user
-    if user.username != db_user.username:
-        existing_user = crud_user.get_user_by_username(db, username=user.username)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-
-    return crud_user.update_user(db=db, db_user=db_user, user=user)
+    return db_user
 
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user(db, user_id=user_id)
+async def delete_user(user_id: int, db: AnySession = Depends(get_db)):
+    db_user = await run_db(db, crud_user.get_user, user_id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    crud_user.delete_user(db=db, db_user=db_user)
+    await run_db(db, crud_user.delete_user, db_user=db_user)
     return {"message": "User deleted successfully"}
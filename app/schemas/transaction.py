@@ -1,12 +1,21 @@
 from datetime import datetime, date
 from decimal import Decimal
-from pydantic import BaseModel, ConfigDict, Field
-from typing import Literal
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Any, Literal
+
+
+# 金額の上限（従来のNUMERIC(10,2)と同じ。補助単位のBIGINTに変換する前に422で弾く）
+TRANSACTION_MAX_AMOUNT = 99_999_999.99
 
 
 class TransactionBase(BaseModel):
     category_id: int | None = None
-    amount: float = Field(gt=0, description="Amount must be greater than 0")
+    amount: float = Field(
+        gt=0,
+        le=TRANSACTION_MAX_AMOUNT,
+        allow_inf_nan=False,
+        description=f"Amount must be greater than 0 and at most {TRANSACTION_MAX_AMOUNT}"
+    )
     transaction_type: Literal["income", "expense"]
     description: str | None = None
     transaction_date: date
@@ -16,6 +25,37 @@ class TransactionCreate(TransactionBase):
     pass
 
 
+# 一括作成で1リクエストに含められる最大件数
+TRANSACTION_BULK_MAX_ITEMS = 5000
+
+
+# 一括作成の行ごとの検証用（不正な行をリクエスト全体の422ではなく行ごとのエラーにするため）
+transaction_create_adapter = TypeAdapter(TransactionCreate)
+
+
+class TransactionBulkCreate(BaseModel):
+    # 行はTransactionCreateの形式。ここでは検証せず、transaction_create_adapterで1行ずつ検証する
+    items: list[dict[str, Any]] = Field(
+        min_length=1,
+        max_length=TRANSACTION_BULK_MAX_ITEMS,
+        description=f"Up to {TRANSACTION_BULK_MAX_ITEMS} transactions per request (TransactionCreate objects)"
+    )
+    allow_partial: bool = Field(
+        default=False,
+        description="If true, valid rows are created even when other rows fail"
+    )
+
+
+class TransactionBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class TransactionBulkResult(BaseModel):
+    created_ids: list[int]
+    errors: list[TransactionBulkError]
+
+
 class TransactionResponse(TransactionBase):
     id: int
     user_id: int
@@ -23,3 +63,48 @@ class TransactionResponse(TransactionBase):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
+
+
+# 一括取得で1リクエストに含められる最大ID数
+TRANSACTION_BATCH_GET_MAX_IDS = 500
+
+
+class TransactionBatchGet(BaseModel):
+    ids: list[int] = Field(
+        min_length=1,
+        max_length=TRANSACTION_BATCH_GET_MAX_IDS,
+        description=f"Up to {TRANSACTION_BATCH_GET_MAX_IDS} transaction ids per request"
+    )
+
+
+class TransactionBatchGetItem(BaseModel):
+    id: int
+    # 単体取得（GET /{transaction_id}）と同じステータスコード
+    status: int
+    detail: str | None = None
+    transaction: TransactionResponse | None = None
+
+
+class TransactionBatchGetResult(BaseModel):
+    # リクエストのids順（重複したIDはそのまま重複して返す）
+    items: list[TransactionBatchGetItem]
+
+
+class TransactionSummaryBucket(BaseModel):
+    period_start: date
+    transaction_type: Literal["income", "expense"]
+    category_id: int | None = None
+    total_amount: float
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionBalance(BaseModel):
+    transaction_date: date
+    income: float
+    expense: float
+    # その日の終わり時点の累計残高（収入 - 支出）
+    balance: float
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,71 @@
+"""トランザクションの説明文（description）の全文検索用DDL
+
+PostgreSQL: pg_trgm のGINインデックスで ILIKE '%q%' を処理し、word_similarity で順位付け
+SQLite: FTS5（trigramトークナイザー）の外部コンテンツテーブルをトリガーで同期し、bm25 で順位付け
+どちらもトライグラムのため、インデックスを使えるのは3文字以上の検索語
+"""
+from sqlalchemy import DDL, Table, event, text
+
+MIN_QUERY_LENGTH = 3
+
+TRGM_INDEX = "ix_transactions_description_trgm"
+FTS_TABLE = "transactions_fts"
+
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON transactions USING gin (description gin_trgm_ops)",
+]
+POSTGRESQL_DROP_DDL = [
+    f"DROP INDEX IF EXISTS {TRGM_INDEX}",
+]
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "description, content='transactions', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description ON transactions BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description) VALUES ('delete', old.id, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description); END",
+]
+# 既存のトランザクションから索引を作り直す（マイグレーションで使用）
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+SQLITE_DROP_DDL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def escape_like(value: str) -> str:
+    """LIKEのワイルドカードをエスケープ（ESCAPE '\\' と組み合わせて使う）"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def fts_phrase(value: str) -> str:
+    """FTS5のMATCHに渡すフレーズ（演算子として解釈されないよう二重引用符で囲む）"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _pg_trgm_available(ddl, target, bind, **kw) -> bool:
+    return bind.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+    ).scalar()
+
+
+def install_search_ddl(table: Table):
+    """create_all・drop_allでテーブルと一緒に検索用のインデックスを作成・削除
+
+    本番のスキーマはマイグレーションで作成する。PostgreSQLでpg_trgmが使えない環境では作成しない
+    """
+    for statement in SQLITE_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in SQLITE_DROP_DDL:
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRESQL_DDL:
+        event.listen(
+            table, "after_create", DDL(statement).execute_if(dialect="postgresql", callable_=_pg_trgm_available)
+        )
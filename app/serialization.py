@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # orjsonがない環境ではPydanticのTypeAdapterでシリアライズ
+    orjson = None
+
+
+def _orjson_default(value):
+    """orjsonが直接扱えない型の変換（Numeric列のDecimalはレスポンススキーマと同じくfloat）"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def _plain_value(value):
+    """to_jsonはDecimalを文字列にするため、レスポンススキーマに合わせてfloatに変換"""
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class ListEncoder:
+    """一覧レスポンス用のエンコーダー（スキーマごとに事前構築）
+
+    行ごとのPydanticモデル生成（from_attributesでの再検証）を行わず、
+    ORMオブジェクト・Coreの行から直接JSONバイト列を作る
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        self.fields = tuple(schema.model_fields)
+        self.adapter = TypeAdapter(list[schema])
+
+    def encode(self, rows) -> bytes:
+        # キャッシュ済みのPydanticモデルは検証なしでそのままシリアライズ
+        if rows and isinstance(rows[0], BaseModel):
+            return self.adapter.dump_json(rows)
+        if orjson is None:
+            return self.adapter.dump_json(self.adapter.validate_python(rows, from_attributes=True))
+        fields = self.fields
+        return orjson.dumps([{field: getattr(row, field) for field in fields} for row in rows], default=_orjson_default)
+
+
+_encoders: dict[type[BaseModel], ListEncoder] = {}
+
+
+def json_list_response(schema: type[BaseModel], rows, headers: dict[str, str] | None = None) -> Response:
+    """一覧をJSONレスポンスとして返す（FAST_JSON_RESPONSES=Trueの場合に使用）"""
+    encoder = _encoders.get(schema)
+    if encoder is None:
+        encoder = _encoders[schema] = ListEncoder(schema)
+    return Response(content=encoder.encode(rows), media_type="application/json", headers=headers)
+
+
+def sparse_list_response(rows, fields: list[str], headers: dict[str, str] | None = None) -> Response:
+    """指定された列だけを持つ一覧をJSONレスポンスとして返す（fields= 指定時に使用）"""
+    if orjson is None:
+        items = [{field: _plain_value(getattr(row, field)) for field in fields} for row in rows]
+        return Response(content=to_json(items), media_type="application/json", headers=headers)
+    items = [{field: getattr(row, field) for field in fields} for row in rows]
+    content = orjson.dumps(items, default=_orjson_default)
+    return Response(content=content, media_type="application/json", headers=headers)
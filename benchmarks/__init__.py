@@ -0,0 +1,36 @@
+"""ベンチマーク共通の設定
+
+ベンチマークはアプリのテーブルを作り直すため、対象のDBは --database-url か BENCH_DATABASE_URL
+でのみ指定する（.envrc で読み込まれる開発用の DATABASE_URL は使わない）。未指定時は一時ファイルのSQLite
+"""
+import argparse
+import os
+import tempfile
+
+BENCH_DATABASE_URL_ENV = "BENCH_DATABASE_URL"
+
+
+def add_database_url_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--database-url",
+        help=f"database to benchmark (default: ${BENCH_DATABASE_URL_ENV}, or a temporary SQLite file). "
+        "Its tables are dropped and recreated unless stated otherwise; DATABASE_URL is never used"
+    )
+
+
+def use_benchmark_database() -> str:
+    """ベンチマーク用のDBをアプリの設定（DATABASE_URL）に反映し、そのURLを返す
+
+    アプリの読み込み前に呼ぶ。開発用のリードレプリカ（DATABASE_READ_URL）も参照しないよう無効にする
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    add_database_url_argument(parser)
+    args, _ = parser.parse_known_args()
+    url = (
+        args.database_url
+        or os.environ.get(BENCH_DATABASE_URL_ENV)
+        or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    )
+    os.environ["DATABASE_URL"] = url
+    os.environ["DATABASE_READ_URL"] = ""
+    return url
@@ -0,0 +1,133 @@
+"""一覧APIのシリアライズ性能ベンチマーク
+
+GET /api/v1/transactions/?limit=N を通常モードと FAST_JSON_RESPONSES モードで
+繰り返し呼び出し、1秒あたりの行数をJSONで出力する。
+encoding_only はDB読み込みを除いたシリアライズ部分のみの比較
+
+使い方:
+    python -m benchmarks.serialization [--rows 1000] [--iterations 200] [--database-url URL]
+
+--database-url・BENCH_DATABASE_URL のDB（未指定時は一時ファイルのSQLite）のテーブルを作り直す
+（開発用の DATABASE_URL は使わない）
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from benchmarks import add_database_url_argument, use_benchmark_database
+
+# アプリの読み込み前にベンチマーク用のDBを指定
+use_benchmark_database()
+os.environ.setdefault("CATEGORY_CACHE_PRELOAD", "False")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers.transactions import TEMP_USER_ID  # noqa: E402
+from app.serialization import orjson  # noqa: E402
+
+
+def seed(rows: int):
+    """仮ユーザーとトランザクションを作成"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(User(id=TEMP_USER_ID, email="bench@example.com", username="bench"))
+        db.commit()
+        from app.crud.transaction import create_transactions
+        from app.schemas.transaction import TransactionCreate
+
+        create_transactions(db, [
+            TransactionCreate(
+                amount=1000 + i,
+                transaction_type="expense" if i % 3 else "income",
+                description=f"ベンチマーク {i}",
+                transaction_date=date(2025, 1, 1) + timedelta(days=i % 365)
+            )
+            for i in range(rows)
+        ], user_id=TEMP_USER_ID)
+    finally:
+        db.close()
+
+
+def measure(client: TestClient, rows: int, iterations: int, fast: bool) -> dict:
+    settings.FAST_JSON_RESPONSES = fast
+    path = f"/api/v1/transactions/?limit={rows}"
+    body = client.get(path).content  # ウォームアップ
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        response = client.get(path)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    return {
+        "mode": "fast_json" if fast else "default",
+        "rows_per_request": rows,
+        "iterations": iterations,
+        "requests_per_sec": round(iterations / elapsed, 1),
+        "rows_per_sec": round(rows * iterations / elapsed),
+        "body": body,
+    }
+
+
+def measure_encoding(rows: int, iterations: int) -> dict:
+    """DB読み込みを除いたシリアライズ部分のみの比較（同じORMオブジェクトを変換）"""
+    from pydantic import TypeAdapter
+
+    from app.crud.transaction import get_transactions
+    from app.schemas.transaction import TransactionResponse
+    from app.serialization import ListEncoder
+
+    db = SessionLocal()
+    try:
+        db_transactions = get_transactions(db, user_id=TEMP_USER_ID, limit=rows)
+        # FastAPIのresponse_model経路（行ごとに検証してからdump_json）
+        adapter = TypeAdapter(list[TransactionResponse])
+        encoder = ListEncoder(TransactionResponse)
+
+        results = {}
+        for name, encode in [
+            ("response_model", lambda: adapter.dump_json(adapter.validate_python(db_transactions, from_attributes=True))),
+            ("fast_json", lambda: encoder.encode(db_transactions)),
+        ]:
+            encode()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                encode()
+            results[name] = round(len(db_transactions) * iterations / (time.perf_counter() - started))
+    finally:
+        db.close()
+    return {"rows_per_sec": results, "speedup": round(results["fast_json"] / results["response_model"], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_url_argument(parser)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per page (limit)")
+    parser.add_argument("--iterations", type=int, default=200, help="requests per mode")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    with TestClient(app) as client:
+        default = measure(client, args.rows, args.iterations, fast=False)
+        fast = measure(client, args.rows, args.iterations, fast=True)
+
+    assert json.loads(default.pop("body")) == json.loads(fast.pop("body")), "responses differ"
+    print(json.dumps({
+        "endpoint": "GET /api/v1/transactions/",
+        "json_backend": "orjson" if orjson is not None else "pydantic",
+        "results": [default, fast],
+        "speedup": round(fast["rows_per_sec"] / default["rows_per_sec"], 2),
+        "encoding_only": measure_encoding(args.rows, args.iterations),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
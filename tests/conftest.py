@@ -1,45 +1,150 @@
+import os
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
-from app.database import Base, get_db
+from app.cache import category_cache
+from app.config import settings
+from app.database import Base, enable_sqlite_foreign_keys, get_db, to_async_url
 from app.main import app
+from app.metrics import enable_query_metrics
+from app.models.user import User
+from app.routers.transactions import TEMP_USER_ID
+
+# テストではDATABASE_URLのDBに接続しないよう起動時のキャッシュ読み込みを無効化
+settings.CATEGORY_CACHE_PRELOAD = False
 
-# テスト用のインメモリSQLiteデータベース
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# テスト用データベース（TEST_DATABASE_URLでPostgreSQLを指定可能、未指定はインメモリSQLite）
+SQLALCHEMY_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite:///:memory:")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+else:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+enable_sqlite_foreign_keys(engine)
+enable_query_metrics(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class QueryCounter:
+    """テスト用エンジンで実行されたSQLを記録"""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @contextmanager
+    def max_queries(self, budget: int):
+        """ブロック内のSQL発行数が budget 以下であることを確認"""
+        start = len(self.statements)
+        yield
+        executed = self.statements[start:]
+        assert len(executed) <= budget, (
+            f"{len(executed)} queries executed (budget {budget}):\n" + "\n".join(executed)
+        )
+
+
+# 有効なカウンター（query_counter フィクスチャの使用中のみ）
+_query_counters: list[QueryCounter] = []
+
+
+def count_queries(engine: Engine):
+    """エンジンで実行されたSQLを有効なカウンターに記録"""
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        for counter in _query_counters:
+            counter.statements.append(statement)
+
+
+count_queries(engine)
+
+
+@pytest.fixture(params=["sync", "async"])
+def db_mode(request):
+    """同期・非同期の両方のDBアクセス経路でテストを実行"""
+    return request.param
+
+
 @pytest.fixture
-def db_session():
+def db_engine(db_mode, tmp_path):
+    """テスト用エンジン（SQLiteの非同期モードは別接続から見えるようファイルDBを使用）"""
+    if db_mode == "sync" or engine.dialect.name != "sqlite":
+        yield engine
+        return
+
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    enable_sqlite_foreign_keys(file_engine)
+    enable_query_metrics(file_engine)
+    count_queries(file_engine)
+    yield file_engine
+    file_engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
     """テスト用データベースセッション"""
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+    Base.metadata.create_all(bind=db_engine)
+    db = TestingSessionLocal(bind=db_engine)
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=db_engine)
 
 
 @pytest.fixture
-def client(db_session):
+def client(db_mode, db_engine, db_session):
     """テスト用FastAPIクライアント"""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    if db_mode == "sync":
+        def override_get_db():
+            try:
+                yield db_session
+            finally:
+                pass
+    else:
+        async_engine = create_async_engine(to_async_url(db_engine.url), poolclass=NullPool)
+        enable_sqlite_foreign_keys(async_engine.sync_engine)
+        enable_query_metrics(async_engine.sync_engine)
+        count_queries(async_engine.sync_engine)
+        AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_db():
+            async with AsyncTestingSessionLocal() as db:
+                yield db
 
+    # テストごとにDBを作り直すためカテゴリーキャッシュも破棄
+    category_cache.clear()
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    category_cache.clear()
+
+
+@pytest.fixture
+def temp_user(db_session):
+    """トランザクションの所有者となる仮ユーザー（TEMP_USER_ID）を作成"""
+    db_session.add(User(id=TEMP_USER_ID, email="temp@example.com", username="temp"))
+    db_session.commit()
+
+
+@pytest.fixture
+def query_counter():
+    """SQL発行数の上限を確認するカウンター
+
+    with query_counter.max_queries(2):
+        client.get(...)
+    """
+    counter = QueryCounter()
+    _query_counters.append(counter)
+    yield counter
+    _query_counters.remove(counter)
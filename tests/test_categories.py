@@ -61,6 +61,18 @@ def test_get_categories(client):
     assert data[1]["name"] == "交通費"
 
 
+def test_get_categories_total_count(client):
+    """指定時のみ X-Total-Count を返すテスト（キャッシュから）"""
+    for name in ["食費", "交通費", "日用品"]:
+        client.post("/api/v1/categories/", json={"name": name})
+
+    assert "X-Total-Count" not in client.get("/api/v1/categories/").headers
+    response = client.get("/api/v1/categories/?limit=2&total_count=estimated")
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "3"
+    assert client.get("/api/v1/categories/?total_count=exact").headers["X-Total-Count"] == "3"
+
+
 def test_update_category(client):
     """カテゴリー更新のテスト"""
     # カテゴリー作成
@@ -114,3 +126,87 @@ def test_delete_category_not_found(client):
     response = client.delete("/api/v1/categories/9999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json()["detail"] == "Category not found"
+
+
+def test_get_categories_served_from_cache(client, db_session):
+    """カテゴリー一覧がキャッシュから返り、TTL経過後に再読み込みされるテスト"""
+    from app.cache import category_cache
+    from app.models.category import Category
+
+    client.post("/api/v1/categories/", json={"name": "食費"})
+    client.post("/api/v1/categories/", json={"name": "交通費"})
+    assert len(client.get("/api/v1/categories/").json()) == 2
+
+    # 別ワーカーでの削除を模擬（DBを直接変更）
+    db_session.query(Category).filter(Category.name == "交通費").delete()
+    db_session.commit()
+
+    # TTL内はキャッシュの内容
+    assert len(client.get("/api/v1/categories/").json()) == 2
+
+    # TTL経過後は再読み込み
+    ttl_seconds = category_cache.ttl_seconds
+    category_cache.ttl_seconds = 0
+    try:
+        data = client.get("/api/v1/categories/").json()
+    finally:
+        category_cache.ttl_seconds = ttl_seconds
+    assert [category["name"] for category in data] == ["食費"]
+
+
+def test_category_cache_write_through(client):
+    """作成・更新・削除がキャッシュに即時反映されるテスト"""
+    from app.cache import category_cache
+
+    create_response = client.post("/api/v1/categories/", json={"name": "食費"})
+    category_id = create_response.json()["id"]
+    assert category_cache.get(category_id).name == "食費"
+
+    client.put(f"/api/v1/categories/{category_id}", json={"name": "外食"})
+    assert category_cache.get_by_name("外食").id == category_id
+    assert category_cache.get_by_name("食費") is None
+    assert client.get(f"/api/v1/categories/{category_id}").json()["name"] == "外食"
+
+    client.delete(f"/api/v1/categories/{category_id}")
+    assert category_cache.get(category_id) is None
+    assert client.get("/api/v1/categories/").json() == []
+
+
+def test_category_query_budgets(client, query_counter):
+    """カテゴリーAPIのSQL発行数の上限"""
+    for name in ["食費", "交通費", "趣味"]:
+        client.post("/api/v1/categories/", json={"name": name})
+
+    with query_counter.max_queries(1):
+        category_id = client.post("/api/v1/categories/", json={"name": "日用品"}).json()["id"]
+    with query_counter.max_queries(1):
+        client.get(f"/api/v1/categories/{category_id}")
+    # キャッシュから返すためSQLなし
+    with query_counter.max_queries(0):
+        assert len(client.get("/api/v1/categories/").json()) == 4
+        client.get("/api/v1/categories/?total_count=exact")
+    with query_counter.max_queries(2):
+        client.put(f"/api/v1/categories/{category_id}", json={"name": "雑費"})
+    # カテゴリー取得・日次集計の付け替え・トランザクションの切り離し・削除
+    with query_counter.max_queries(7):
+        client.delete(f"/api/v1/categories/{category_id}")
+
+
+def test_get_categories_etag(client):
+    """カテゴリー一覧のETagと、変更がない場合の304のテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "食費"}).json()["id"]
+
+    etag = client.get("/api/v1/categories/").headers["ETag"]
+    response = client.get("/api/v1/categories/", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    # 内容から計算するため、キャッシュを読み直しても同じ値（他のワーカーとも一致）
+    from app.cache import category_cache
+    category_cache.clear()
+    assert client.get("/api/v1/categories/").headers["ETag"] == etag
+
+    client.put(f"/api/v1/categories/{category_id}", json={"name": "外食"})
+    response = client.get("/api/v1/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
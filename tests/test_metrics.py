@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.metrics import HISTOGRAMS, QueryStats, current_query_stats
+
+
+def _metric_value(text: str, line_prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not found")
+
+
+def test_metrics(client):
+    """ルートテンプレートごとのレイテンシとSQL発行数が /metrics に出力されるテスト"""
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+    client.post("/api/v1/categories/", json={"name": "食費"})
+    client.get("/api/v1/categories/1")
+    client.get("/api/v1/categories/9999")
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+    # パスパラメーターではなくルートテンプレートで集計
+    route = 'method="GET",route="/api/v1/categories/{category_id}"'
+    assert _metric_value(text, f'http_request_duration_seconds_count{{{route},status="200"}}') == 1
+    assert _metric_value(text, f'http_request_duration_seconds_count{{{route},status="404"}}') == 1
+    assert "/api/v1/categories/1" not in text
+
+    # 作成はINSERT 1回
+    assert _metric_value(text, 'http_request_db_queries_sum{method="POST",route="/api/v1/categories/"}') == 1
+    assert _metric_value(text, f'http_request_db_queries_count{{{route}}}') == 2
+    assert _metric_value(text, 'http_request_db_duration_seconds_count{method="POST",route="/api/v1/categories/"}') == 1
+
+
+def test_query_metrics_failed_statement(db_engine):
+    """例外で終わったSQLの計測状態が接続に残らず、完了したSQLだけが計上されるテスト"""
+    token = current_query_stats.set(QueryStats())
+    try:
+        with db_engine.connect() as conn:
+            info_before = dict(conn.info)
+            with pytest.raises(DBAPIError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            conn.rollback()
+            assert dict(conn.info) == info_before
+            conn.execute(text("SELECT 1"))
+        stats = current_query_stats.get()
+        assert stats.count == 1
+        assert stats.seconds >= 0
+    finally:
+        current_query_stats.reset(token)
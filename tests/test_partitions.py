@@ -0,0 +1,21 @@
+from datetime import date
+
+from app.partitions import create_partition_sql, partition_name, partition_start, shift_partition_start
+
+
+def test_partition_bounds():
+    """月単位・年単位のパーティション範囲と名前のテスト"""
+    assert partition_start(date(2025, 3, 17), "month") == date(2025, 3, 1)
+    assert partition_start(date(2025, 3, 17), "year") == date(2025, 1, 1)
+
+    assert shift_partition_start(date(2025, 11, 1), "month", 3) == date(2026, 2, 1)
+    assert shift_partition_start(date(2025, 1, 1), "month", -1) == date(2024, 12, 1)
+    assert shift_partition_start(date(2025, 1, 1), "year", -2) == date(2023, 1, 1)
+
+    assert partition_name(date(2025, 1, 1), "month") == "transactions_y2025m01"
+    assert partition_name(date(2025, 1, 1), "year") == "transactions_y2025"
+
+    assert create_partition_sql(date(2025, 12, 1), "month") == (
+        "CREATE TABLE IF NOT EXISTS transactions_y2025m12 PARTITION OF transactions "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
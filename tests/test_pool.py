@@ -0,0 +1,38 @@
+from fastapi import status
+from sqlalchemy import create_engine, text
+
+from app.pool import TimedQueuePool, _pools, instrument_pool, pool_options
+
+
+def test_pool_status(client, tmp_path):
+    """プールイベントの集計が /health/pool に反映されるテスト"""
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    options = pool_options(url)
+    assert options["poolclass"] is TimedQueuePool
+
+    pool_engine = create_engine(url, **options)
+    stats = instrument_pool("test", pool_engine)
+    try:
+        with pool_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            data = client.get("/health/pool").json()["test"]
+            assert data["checked_out"] == 1
+            assert data["overflow"] == 0
+            connection.invalidate()
+
+        with pool_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        response = client.get("/health/pool")
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()["test"]
+        assert data["pool_class"] == "TimedQueuePool"
+        assert data["checked_out"] == 0
+        assert data["connects"] == 2
+        assert data["checkouts"] == 2
+        assert data["invalidations"] == 1
+        assert data["checkout_wait_seconds_total"] > 0
+        assert stats.checkout_wait_seconds_max <= data["checkout_wait_seconds_total"]
+    finally:
+        _pools.pop("test")
+        pool_engine.dispose()
@@ -0,0 +1,89 @@
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.config import settings
+from app.database import PRIMARY_PIN_COOKIE, Base, to_async_url
+from app.models.user import User
+
+
+@pytest.fixture
+def replica(db_mode, tmp_path, monkeypatch):
+    """プライマリとは別のSQLiteファイルをリードレプリカとして使用"""
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica_engine = create_engine(url, poolclass=NullPool)
+    Base.metadata.create_all(bind=replica_engine)
+    ReplicaSession = sessionmaker(bind=replica_engine)
+    with ReplicaSession() as db:
+        db.add(User(email="replica@example.com", username="replica"))
+        db.commit()
+
+    if db_mode == "sync":
+        factory = ReplicaSession
+    else:
+        async_replica_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+        factory = async_sessionmaker(async_replica_engine, expire_on_commit=False)
+    monkeypatch.setattr(database, "read_session_factories", [factory])
+    yield ReplicaSession
+    replica_engine.dispose()
+
+
+def test_get_endpoints_read_from_replica(client, replica, monkeypatch):
+    """GETはレプリカ、書き込みはプライマリを使い、書き込み後は一定時間プライマリから読むテスト"""
+    def usernames():
+        return [user["username"] for user in client.get("/api/v1/users/").json()]
+
+    assert usernames() == ["replica"]
+
+    # 書き込みはプライマリ
+    response = client.post("/api/v1/users/", json={"email": "primary@example.com", "username": "primary"})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    with replica() as db:
+        assert db.query(User).filter(User.username == "primary").first() is None
+
+    # 書き込んだクライアントはプライマリから読む（read-your-writes）
+    assert usernames() == ["primary"]
+    assert client.get(f"/api/v1/users/{response.json()['id']}").status_code == status.HTTP_200_OK
+
+    # 期限切れ・別のクライアントはレプリカ
+    client.cookies.set(PRIMARY_PIN_COOKIE, "0")
+    assert usernames() == ["replica"]
+
+    # 失敗した書き込みでは固定しない
+    client.cookies.clear()
+    response = client.post("/api/v1/users/", json={"email": "primary@example.com", "username": "primary"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+
+    # READ_YOUR_WRITES_SECONDS=0 では固定しない
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    response = client.post("/api/v1/users/", json={"email": "other@example.com", "username": "other"})
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+    assert usernames() == ["replica"]
+
+
+def test_batch_get_reads_from_replica_without_pinning(client, replica):
+    """参照のみのPOST（一括取得）はレプリカから読み、プライマリに固定しないテスト"""
+    from datetime import date
+
+    from app.models.transaction import Transaction
+    from app.routers.transactions import TEMP_USER_ID
+
+    with replica() as db:
+        db.add(User(id=TEMP_USER_ID, email="temp@example.com", username="temp"))
+        db.add(Transaction(
+            id=1, user_id=TEMP_USER_ID, amount=1000, transaction_type="expense", transaction_date=date.today()
+        ))
+        db.commit()
+
+    # プライマリには行がないため、取得できればレプリカから読んでいる
+    for _ in range(2):
+        response = client.post("/api/v1/transactions/batch-get", json={"ids": [1]})
+        assert response.status_code == status.HTTP_200_OK
+        assert PRIMARY_PIN_COOKIE not in response.cookies
+        assert response.json()["items"][0]["status"] == status.HTTP_200_OK
@@ -1,6 +1,14 @@
+import csv
+import io
+import json
+
+import pytest
 from fastapi import status
 from datetime import date, timedelta
 
+# トランザクションはusersへの外部キーを持つため仮ユーザーを作成しておく
+pytestmark = pytest.mark.usefixtures("temp_user")
+
 
 def test_create_transaction_with_category(client):
     """カテゴリー付き収支作成のテスト"""
@@ -250,3 +258,821 @@ def test_category_deleted_sets_transaction_category_to_null(client):
     transaction_response = client.get(f"/api/v1/transactions/{transaction_id}")
     assert transaction_response.status_code == status.HTTP_200_OK
     assert transaction_response.json()["category_id"] is None
+
+
+def test_get_transactions_cursor_pagination(client):
+    """カーソルページングのテスト"""
+    # 同じ日付を含む複数収支作成
+    for days_ago in [0, 1, 1, 2, 3]:
+        client.post(
+            "/api/v1/transactions/",
+            json={
+                "amount": 1000,
+                "transaction_type": "expense",
+                "transaction_date": str(date.today() - timedelta(days=days_ago))
+            }
+        )
+
+    # 1ページ目取得
+    response = client.get("/api/v1/transactions/?limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    assert len(first_page) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    # 2ページ目取得
+    response = client.get(f"/api/v1/transactions/?limit=2&cursor={cursor}")
+    assert response.status_code == status.HTTP_200_OK
+    second_page = response.json()
+    assert len(second_page) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    # 3ページ目取得（最終ページ）
+    response = client.get(f"/api/v1/transactions/?limit=2&cursor={cursor}")
+    assert response.status_code == status.HTTP_200_OK
+    third_page = response.json()
+    assert len(third_page) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+    # 重複・欠落なく日付降順で全件取得できる
+    all_rows = first_page + second_page + third_page
+    assert len({row["id"] for row in all_rows}) == 5
+    keys = [(row["transaction_date"], row["id"]) for row in all_rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_get_transactions_invalid_cursor(client):
+    """不正なカーソルで400のテスト"""
+    response = client.get("/api/v1/transactions/?cursor=invalid")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_get_transaction_summary(client):
+    """期間別集計のテスト"""
+    # 2ヶ月分の収支作成
+    for amount, transaction_type, transaction_date in [
+        (1000, "expense", "2025-01-05"),
+        (2500, "expense", "2025-01-20"),
+        (300000, "income", "2025-01-25"),
+        (4000, "expense", "2025-02-10"),
+    ]:
+        client.post(
+            "/api/v1/transactions/",
+            json={
+                "amount": amount,
+                "transaction_type": transaction_type,
+                "transaction_date": transaction_date
+            }
+        )
+
+    # 月別集計
+    response = client.get("/api/v1/transactions/summary?period=month")
+    assert response.status_code == status.HTTP_200_OK
+    data = sorted(response.json(), key=lambda row: (row["period_start"], row["transaction_type"]))
+    assert data == [
+        {"period_start": "2025-01-01", "transaction_type": "expense", "category_id": None, "total_amount": 3500, "count": 2},
+        {"period_start": "2025-01-01", "transaction_type": "income", "category_id": None, "total_amount": 300000, "count": 1},
+        {"period_start": "2025-02-01", "transaction_type": "expense", "category_id": None, "total_amount": 4000, "count": 1},
+    ]
+
+    # 週別集計（月曜始まり）+ フィルター
+    response = client.get(
+        "/api/v1/transactions/summary?period=week&transaction_type=expense&end_date=2025-01-31"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [(row["period_start"], row["total_amount"]) for row in data] == [
+        ("2024-12-30", 1000),
+        ("2025-01-20", 2500),
+    ]
+
+
+def test_get_transaction_summary_invalid_period(client):
+    """不正な集計期間で422のテスト"""
+    response = client.get("/api/v1/transactions/summary?period=hour")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_create_transaction_amount_bounds(client):
+    """上限を超える金額・無限大・NaNは422になり、上限ちょうどは作成できるテスト"""
+    from app.schemas.transaction import TRANSACTION_MAX_AMOUNT
+
+    item = {"transaction_type": "expense", "transaction_date": str(date.today())}
+    for amount in [1e17, TRANSACTION_MAX_AMOUNT + 0.01, "Infinity", "NaN"]:
+        response = client.post("/api/v1/transactions/", json={**item, "amount": amount})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = client.post("/api/v1/transactions/", json={**item, "amount": TRANSACTION_MAX_AMOUNT})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["amount"] == TRANSACTION_MAX_AMOUNT
+
+    # 一括作成では行ごとのエラー
+    response = client.post(
+        "/api/v1/transactions/bulk",
+        json={"items": [{**item, "amount": 1e17}, {**item, "amount": 1000}], "allow_partial": True}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [error["index"] for error in response.json()["errors"]] == [0]
+
+
+def test_create_transactions_bulk(client):
+    """収支一括作成のテスト"""
+    category_response = client.post(
+        "/api/v1/categories/",
+        json={"name": "食費"}
+    )
+    category_id = category_response.json()["id"]
+
+    response = client.post(
+        "/api/v1/transactions/bulk",
+        json={
+            "items": [
+                {"category_id": category_id, "amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())},
+                {"amount": 50000, "transaction_type": "income", "transaction_date": str(date.today())},
+            ]
+        }
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert len(data["created_ids"]) == 2
+    assert data["errors"] == []
+
+    response = client.get("/api/v1/transactions/")
+    assert len(response.json()) == 2
+
+
+def test_create_transactions_bulk_rejects_invalid_category(client):
+    """存在しないカテゴリーを含む一括作成は全件失敗するテスト"""
+    response = client.post(
+        "/api/v1/transactions/bulk",
+        json={
+            "items": [
+                {"amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())},
+                {"category_id": 9999, "amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())},
+            ]
+        }
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == [{"index": 1, "detail": "Category not found"}]
+
+    # 何も作成されていない
+    response = client.get("/api/v1/transactions/")
+    assert response.json() == []
+
+
+def test_create_transactions_bulk_allow_partial(client):
+    """部分成功モードの一括作成のテスト"""
+    response = client.post(
+        "/api/v1/transactions/bulk",
+        json={
+            "items": [
+                {"category_id": 9999, "amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())},
+                {"amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())},
+            ],
+            "allow_partial": True
+        }
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert len(data["created_ids"]) == 1
+    assert data["errors"] == [{"index": 0, "detail": "Category not found"}]
+
+
+def test_create_transactions_bulk_invalid_rows(client):
+    """不正な行（検証エラー）は行ごとのエラーになり、部分成功モードでは他の行を作成するテスト"""
+    items = [
+        {"amount": -5, "transaction_type": "expense", "transaction_date": str(date.today())},
+        {"amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())},
+        {"amount": 1000, "transaction_type": "expense", "transaction_date": "2025-13-01"},
+        {"category_id": 9999, "amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())},
+    ]
+    response = client.post("/api/v1/transactions/bulk", json={"items": items})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [error["index"] for error in response.json()["detail"]] == [0, 2, 3]
+    assert response.json()["detail"][0]["detail"].startswith("amount: ")
+    assert response.json()["detail"][1]["detail"].startswith("transaction_date: ")
+    assert client.get("/api/v1/transactions/").json() == []
+
+    response = client.post("/api/v1/transactions/bulk", json={"items": items, "allow_partial": True})
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert len(data["created_ids"]) == 1
+    assert [error["index"] for error in data["errors"]] == [0, 2, 3]
+    assert data["errors"][2]["detail"] == "Category not found"
+    assert [item["amount"] for item in client.get("/api/v1/transactions/").json()] == [2000]
+
+
+def test_create_transactions_bulk_deleted_category(client, db_session, monkeypatch):
+    """他のワーカーで削除されたカテゴリー（キャッシュに残っている・確認後に削除）は行ごとのエラーになるテスト"""
+    from app.cache import category_cache
+    from app.crud import category as crud_category
+    from app.models.category import Category
+
+    category_id = client.post("/api/v1/categories/", json={"name": "食費"}).json()["id"]
+    db_session.query(Category).filter(Category.id == category_id).delete()
+    db_session.commit()
+    assert category_cache.get(category_id) is not None
+
+    items = [
+        {"category_id": category_id, "amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())},
+        {"amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())},
+    ]
+    response = client.post("/api/v1/transactions/bulk", json={"items": items})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == [{"index": 0, "detail": "Category not found"}]
+
+    # 存在確認の後、INSERTまでの間に削除された場合は外部キー制約違反から確認し直す
+    get_existing_category_ids = crud_category.get_existing_category_ids
+    calls = []
+
+    def stale_then_fresh(db, category_ids):
+        calls.append(category_ids)
+        return set(category_ids) if len(calls) == 1 else get_existing_category_ids(db, category_ids)
+
+    monkeypatch.setattr(crud_category, "get_existing_category_ids", stale_then_fresh)
+    response = client.post("/api/v1/transactions/bulk", json={"items": items, "allow_partial": True})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(response.json()["created_ids"]) == 1
+    assert response.json()["errors"] == [{"index": 0, "detail": "Category not found"}]
+    assert len(calls) == 2
+    assert len(client.get("/api/v1/transactions/").json()) == 1
+
+
+def test_create_transactions_bulk_size_cap(client):
+    """一括作成の件数上限のテスト"""
+    from app.schemas.transaction import TRANSACTION_BULK_MAX_ITEMS
+
+    item = {"amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())}
+    response = client.post(
+        "/api/v1/transactions/bulk",
+        json={"items": [item] * (TRANSACTION_BULK_MAX_ITEMS + 1)}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_transactions_batch(client, db_session):
+    """IDリストでの一括取得のテスト（リクエスト順、存在しない・他人のものはIDごとにステータス）"""
+    from app.models.transaction import Transaction
+    from app.models.user import User
+
+    other_user = User(email="other@example.com", username="other")
+    db_session.add(other_user)
+    db_session.commit()
+    other_transaction = Transaction(
+        user_id=other_user.id, amount=1000, transaction_type="expense", transaction_date=date.today()
+    )
+    db_session.add(other_transaction)
+    db_session.commit()
+    other_id = other_transaction.id
+
+    first_id = client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000.5, "transaction_type": "expense", "description": "昼食", "transaction_date": "2025-01-05"}
+    ).json()["id"]
+    second_id = client.post(
+        "/api/v1/transactions/",
+        json={"amount": 50000, "transaction_type": "income", "transaction_date": "2025-01-25"}
+    ).json()["id"]
+
+    response = client.post(
+        "/api/v1/transactions/batch-get",
+        json={"ids": [second_id, 9999, other_id, first_id, second_id]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()["items"]
+    assert [(item["id"], item["status"]) for item in items] == [
+        (second_id, 200), (9999, 404), (other_id, 403), (first_id, 200), (second_id, 200)
+    ]
+    assert items[0]["transaction"]["amount"] == 50000
+    assert items[3]["transaction"]["description"] == "昼食"
+    assert items[3]["transaction"]["amount"] == 1000.5
+    assert items[1]["transaction"] is None
+    assert items[1]["detail"] == "Transaction not found"
+    assert items[2]["transaction"] is None
+    assert items[2]["detail"] == "Not authorized to access this transaction"
+
+
+def test_get_transactions_batch_size_cap(client):
+    """一括取得のID数の上限・空リストのテスト"""
+    from app.schemas.transaction import TRANSACTION_BATCH_GET_MAX_IDS
+
+    response = client.post(
+        "/api/v1/transactions/batch-get",
+        json={"ids": list(range(1, TRANSACTION_BATCH_GET_MAX_IDS + 2))}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = client.post("/api/v1/transactions/batch-get", json={"ids": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_export_transactions_ndjson(client):
+    """NDJSONエクスポートのテスト"""
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000.5, "transaction_type": "expense", "description": "昼食", "transaction_date": "2025-01-05"}
+    )
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 50000, "transaction_type": "income", "transaction_date": "2025-01-25"}
+    )
+
+    response = client.get("/api/v1/transactions/export?format=ndjson")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["transaction_date"] for line in lines] == ["2025-01-25", "2025-01-05"]
+    assert lines[1]["amount"] == 1000.5
+    assert lines[1]["description"] == "昼食"
+    assert lines[1]["transaction_type"] == "expense"
+
+    # 一覧APIと同じ内容
+    list_response = client.get("/api/v1/transactions/")
+    assert lines == list_response.json()
+
+
+def test_export_transactions_csv_with_filter(client):
+    """CSVエクスポート（フィルター付き）のテスト"""
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    )
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 50000, "transaction_type": "income", "transaction_date": "2025-01-25"}
+    )
+
+    response = client.get("/api/v1/transactions/export?format=csv&transaction_type=income")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["transaction_type"] == "income"
+    assert float(rows[0]["amount"]) == 50000
+
+
+def test_transaction_summary_follows_update_and_delete(client):
+    """更新・削除が日次集計に反映されるテスト"""
+    category_response = client.post(
+        "/api/v1/categories/",
+        json={"name": "食費"}
+    )
+    category_id = category_response.json()["id"]
+
+    create_response = client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    )
+    transaction_id = create_response.json()["id"]
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 500, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    )
+
+    # 日付・カテゴリー・金額を変更（集計行の移動）
+    client.put(
+        f"/api/v1/transactions/{transaction_id}",
+        json={"category_id": category_id, "amount": 2000, "transaction_type": "expense", "transaction_date": "2025-02-10"}
+    )
+    response = client.get("/api/v1/transactions/summary?period=month")
+    data = sorted(response.json(), key=lambda row: row["period_start"])
+    assert data == [
+        {"period_start": "2025-01-01", "transaction_type": "expense", "category_id": None, "total_amount": 500, "count": 1},
+        {"period_start": "2025-02-01", "transaction_type": "expense", "category_id": category_id, "total_amount": 2000, "count": 1},
+    ]
+
+    # カテゴリー削除でカテゴリーなしへ移動
+    client.delete(f"/api/v1/categories/{category_id}")
+    response = client.get("/api/v1/transactions/summary?period=month")
+    data = sorted(response.json(), key=lambda row: row["period_start"])
+    assert data[1]["category_id"] is None
+    assert data[1]["total_amount"] == 2000
+
+    # 削除で集計から除外
+    client.delete(f"/api/v1/transactions/{transaction_id}")
+    response = client.get("/api/v1/transactions/summary?period=month")
+    assert response.json() == [
+        {"period_start": "2025-01-01", "transaction_type": "expense", "category_id": None, "total_amount": 500, "count": 1},
+    ]
+
+
+def test_rebuild_daily_totals(client, db_session):
+    """日次集計の再構築のテスト"""
+    from app.crud.transaction_daily_total import rebuild_daily_totals
+
+    for amount, transaction_date in [(1000, "2025-01-05"), (2500, "2025-01-05"), (4000, "2025-02-10")]:
+        client.post(
+            "/api/v1/transactions/",
+            json={"amount": amount, "transaction_type": "expense", "transaction_date": transaction_date}
+        )
+    before = client.get("/api/v1/transactions/summary?period=day").json()
+
+    rebuild_daily_totals(db_session)
+
+    after = client.get("/api/v1/transactions/summary?period=day").json()
+    assert after == before
+    assert [row["total_amount"] for row in after] == [3500, 4000]
+
+
+def test_daily_totals_match_rounded_amounts(client, db_session):
+    """補助単位への丸めが1件ごとに行われ、日次集計がトランザクションの合計と一致するテスト"""
+    from sqlalchemy import text
+
+    item = {"amount": 0.005, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    client.post("/api/v1/transactions/bulk", json={"items": [item, item]})
+    transaction_id = client.post("/api/v1/transactions/", json=item).json()["id"]
+    client.put(f"/api/v1/transactions/{transaction_id}", json={**item, "amount": 0.015})
+
+    def sums():
+        db_session.expire_all()
+        return (
+            db_session.execute(text("SELECT SUM(amount_minor) FROM transactions")).scalar(),
+            db_session.execute(text("SELECT SUM(total_amount_minor) FROM transaction_daily_totals")).scalar(),
+        )
+
+    assert sums() == (4, 4)
+    response = client.get("/api/v1/transactions/summary?period=day")
+    assert response.json()[0]["total_amount"] == 0.04
+
+    client.delete(f"/api/v1/transactions/{transaction_id}")
+    assert sums() == (2, 2)
+
+
+def test_transaction_balance(client, db_session):
+    """日ごとの累計残高と、月初チェックポイントの作成・無効化のテスト"""
+    from app.crud.transaction_balance_checkpoint import refresh_balance_checkpoints
+    from app.models.transaction_balance_checkpoint import TransactionBalanceCheckpoint
+
+    for amount, transaction_type, transaction_date in [
+        (50000, "income", "2025-01-05"),
+        (1000, "expense", "2025-01-20"),
+        (2000, "expense", "2025-02-10"),
+        (500, "expense", "2025-03-03"),
+    ]:
+        client.post(
+            "/api/v1/transactions/",
+            json={"amount": amount, "transaction_type": transaction_type, "transaction_date": transaction_date}
+        )
+
+    response = client.get("/api/v1/transactions/balance")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"transaction_date": "2025-01-05", "income": 50000, "expense": 0, "balance": 50000},
+        {"transaction_date": "2025-01-20", "income": 0, "expense": 1000, "balance": 49000},
+        {"transaction_date": "2025-02-10", "income": 0, "expense": 2000, "balance": 47000},
+        {"transaction_date": "2025-03-03", "income": 0, "expense": 500, "balance": 46500},
+    ]
+
+    def checkpoint_months():
+        db_session.expire_all()
+        return [str(row.month_start) for row in db_session.query(TransactionBalanceCheckpoint).order_by("month_start")]
+
+    assert refresh_balance_checkpoints(db_session, today=date(2025, 4, 15)) == 3
+    assert checkpoint_months() == ["2025-02-01", "2025-03-01", "2025-04-01"]
+    assert refresh_balance_checkpoints(db_session, today=date(2025, 4, 15)) == 0
+
+    # 開始日より前の分はチェックポイントから残高に含める
+    response = client.get("/api/v1/transactions/balance?start_date=2025-02-15&end_date=2025-03-31")
+    assert response.json() == [{"transaction_date": "2025-03-03", "income": 0, "expense": 500, "balance": 46500}]
+    assert client.get("/api/v1/transactions/balance?start_date=2025-04-01").json() == []
+
+    # 過去の日付への書き込みで、それより後のチェックポイントが無効になる
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000, "transaction_type": "expense", "transaction_date": "2025-02-20"}
+    )
+    assert checkpoint_months() == ["2025-02-01"]
+    response = client.get("/api/v1/transactions/balance?start_date=2025-03-01")
+    assert response.json()[-1]["balance"] == 45500
+
+    assert refresh_balance_checkpoints(db_session, today=date(2025, 4, 15)) == 2
+    response = client.get("/api/v1/transactions/balance?start_date=2025-03-01")
+    assert response.json()[-1]["balance"] == 45500
+
+
+def test_update_transaction_with_invalid_category(client):
+    """存在しないカテゴリーへの更新で404・更新されないテスト"""
+    create_response = client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000, "transaction_type": "expense", "transaction_date": str(date.today())}
+    )
+    transaction_id = create_response.json()["id"]
+
+    response = client.put(
+        f"/api/v1/transactions/{transaction_id}",
+        json={"category_id": 9999, "amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "Category not found"
+
+    # ロールバックされ元の内容のまま
+    get_response = client.get(f"/api/v1/transactions/{transaction_id}")
+    assert get_response.json()["amount"] == 1000
+    summary_response = client.get("/api/v1/transactions/summary")
+    assert summary_response.json()[0]["total_amount"] == 1000
+
+
+def test_update_and_delete_other_users_transaction(client, db_session):
+    """他のユーザーのトランザクションは更新・削除できない（403）テスト"""
+    from app.models.transaction import Transaction
+    from app.models.user import User
+
+    other_user = User(email="other@example.com", username="other")
+    db_session.add(other_user)
+    db_session.commit()
+    other_transaction = Transaction(
+        user_id=other_user.id, amount=1000, transaction_type="expense", transaction_date=date.today()
+    )
+    db_session.add(other_transaction)
+    db_session.commit()
+    transaction_id = other_transaction.id
+
+    response = client.put(
+        f"/api/v1/transactions/{transaction_id}",
+        json={"amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == "Not authorized to update this transaction"
+
+    response = client.delete(f"/api/v1/transactions/{transaction_id}")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == "Not authorized to delete this transaction"
+
+    # 存在しないIDは404
+    response = client.put(
+        "/api/v1/transactions/9999",
+        json={"amount": 2000, "transaction_type": "expense", "transaction_date": str(date.today())}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.delete("/api/v1/transactions/9999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_fast_json_responses_match_default(client, monkeypatch):
+    """高速JSONモードでも一覧レスポンスが通常モードと同一のテスト"""
+    from app.config import settings
+
+    category_id = client.post("/api/v1/categories/", json={"name": "食費"}).json()["id"]
+    client.post("/api/v1/users/", json={"email": "test@example.com", "username": "testuser"})
+    for amount in [1000.5, 2000, 3000]:
+        client.post(
+            "/api/v1/transactions/",
+            json={
+                "category_id": category_id,
+                "amount": amount,
+                "transaction_type": "expense",
+                "description": "スーパーで買い物",
+                "transaction_date": str(date.today())
+            }
+        )
+
+    paths = ["/api/v1/transactions/?limit=2", "/api/v1/users/", "/api/v1/categories/"]
+    default_responses = [client.get(path) for path in paths]
+
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast_responses = [client.get(path) for path in paths]
+
+    for default_response, fast_response in zip(default_responses, fast_responses):
+        assert fast_response.status_code == status.HTTP_200_OK
+        assert fast_response.headers["content-type"] == "application/json"
+        assert fast_response.json() == default_response.json()
+    assert fast_responses[0].headers["X-Next-Cursor"] == default_responses[0].headers["X-Next-Cursor"]
+
+
+def test_get_transactions_with_fields(client):
+    """fields指定で指定した列だけが返るテスト"""
+    for amount, transaction_date in [(1000.5, "2025-01-05"), (2000, "2025-01-10"), (3000, "2025-01-15")]:
+        client.post(
+            "/api/v1/transactions/",
+            json={"amount": amount, "transaction_type": "expense", "transaction_date": transaction_date}
+        )
+
+    response = client.get("/api/v1/transactions/?fields=amount,transaction_date,amount&limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"amount": 3000.0, "transaction_date": "2025-01-15"},
+        {"amount": 2000.0, "transaction_date": "2025-01-10"},
+    ]
+
+    # id を選択していなくてもカーソルで次ページを取得できる
+    next_page = client.get(
+        f"/api/v1/transactions/?fields=amount&limit=2&cursor={response.headers['X-Next-Cursor']}"
+    )
+    assert next_page.json() == [{"amount": 1000.5}]
+
+    response = client.get("/api/v1/transactions/?fields=amount,password")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid fields: password"
+
+
+def test_export_transactions_with_fields(client):
+    """fields指定でエクスポートの列を絞り込むテスト"""
+    client.post(
+        "/api/v1/transactions/",
+        json={"amount": 1000, "transaction_type": "expense", "description": "昼食", "transaction_date": "2025-01-05"}
+    )
+
+    response = client.get("/api/v1/transactions/export?format=ndjson&fields=description,amount")
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"description": "昼食", "amount": 1000.0}]
+
+    response = client.get("/api/v1/transactions/export?format=csv&fields=transaction_type,transaction_date")
+    assert response.text.splitlines() == ["transaction_type,transaction_date", "expense,2025-01-05"]
+
+
+def test_transaction_query_budgets(client, query_counter, db_engine):
+    """トランザクションAPIのSQL発行数の上限（関連の遅延ロードによるN+1を検出）"""
+    category_id = client.post("/api/v1/categories/", json={"name": "食費"}).json()["id"]
+    item = {"category_id": category_id, "amount": 1000, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    owned_ids = [client.post("/api/v1/transactions/", json=item).json()["id"] for _ in range(3)]
+
+    # 書き込みは日次集計・バージョン（ETag）の更新と、以降の残高チェックポイントの削除を含む
+    # INSERT・日次集計のUPSERT・バージョン更新・チェックポイント削除
+    with query_counter.max_queries(4):
+        transaction_id = client.post("/api/v1/transactions/", json=item).json()["id"]
+    # カテゴリー確認・INSERT・日次集計のUPSERT・バージョン更新・チェックポイント削除
+    # （SQLiteはRETURNINGの順序を保証するため1行ずつINSERTする）
+    items = [item] * 3
+    with query_counter.max_queries(5 if db_engine.dialect.name == "postgresql" else len(items) + 4):
+        client.post("/api/v1/transactions/bulk", json={"items": items})
+    with query_counter.max_queries(1):
+        client.get("/api/v1/transactions/summary")
+    # チェックポイントの検索と累計を1文で行う
+    with query_counter.max_queries(1):
+        client.get("/api/v1/transactions/balance?start_date=2025-01-01")
+    with query_counter.max_queries(1):
+        assert len(client.get("/api/v1/transactions/export").text.splitlines()) == 7
+    with query_counter.max_queries(1):
+        client.get(f"/api/v1/transactions/{transaction_id}")
+    # ユーザーで絞り込んだIN 1回（見つからないIDがあれば存在確認のIN 1回を追加）
+    with query_counter.max_queries(1):
+        client.post("/api/v1/transactions/batch-get", json={"ids": [transaction_id, *owned_ids]})
+    with query_counter.max_queries(2):
+        client.post("/api/v1/transactions/batch-get", json={"ids": [transaction_id, 9999, *owned_ids]})
+    # バージョン（ETag）・一覧
+    with query_counter.max_queries(2):
+        response = client.get("/api/v1/transactions/")
+        assert len(response.json()) == 7
+    with query_counter.max_queries(2):
+        client.get("/api/v1/transactions/?fields=amount")
+    # フィルターなしの件数はバージョンと一緒に取得、フィルターありは日次集計から
+    with query_counter.max_queries(2):
+        assert client.get("/api/v1/transactions/?total_count=estimated").headers["X-Total-Count"] == "7"
+    with query_counter.max_queries(3):
+        client.get("/api/v1/transactions/?total_count=estimated&start_date=2025-01-01")
+    # 変更がなければバージョンの確認のみ
+    with query_counter.max_queries(1):
+        client.get("/api/v1/transactions/", headers={"If-None-Match": response.headers["ETag"]})
+    # PostgreSQLは更新前の値をUPDATE文で取得（SQLiteは事前にSELECT）
+    with query_counter.max_queries(4 if db_engine.dialect.name == "postgresql" else 5):
+        client.put(f"/api/v1/transactions/{transaction_id}", json={**item, "amount": 2000})
+    # DELETE・日次集計のUPSERT・空になった集計行の削除・バージョン更新・チェックポイント削除
+    with query_counter.max_queries(5):
+        client.delete(f"/api/v1/transactions/{transaction_id}")
+
+
+def test_get_transactions_total_count(client, db_session):
+    """指定時のみ X-Total-Count を返すテスト（件数カウンター・日次集計・COUNT(*)）"""
+    from app.crud.transaction_daily_total import rebuild_daily_totals
+    from app.models.user_transaction_stats import UserTransactionStats
+
+    for amount, transaction_type, transaction_date in [
+        (1000, "expense", "2025-01-05"),
+        (2000, "expense", "2025-01-20"),
+        (50000, "income", "2025-02-01"),
+    ]:
+        client.post(
+            "/api/v1/transactions/",
+            json={"amount": amount, "transaction_type": transaction_type, "transaction_date": transaction_date}
+        )
+    transaction_id = client.post(
+        "/api/v1/transactions/",
+        json={"amount": 500, "transaction_type": "expense", "transaction_date": "2025-02-10"}
+    ).json()["id"]
+    client.delete(f"/api/v1/transactions/{transaction_id}")
+
+    def total(query: str) -> str:
+        return client.get(f"/api/v1/transactions/?limit=1&{query}").headers["X-Total-Count"]
+
+    assert "X-Total-Count" not in client.get("/api/v1/transactions/").headers
+    for mode in ["estimated", "exact"]:
+        assert total(f"total_count={mode}") == "3"
+        assert total(f"total_count={mode}&transaction_type=expense") == "2"
+        assert total(f"total_count={mode}&start_date=2025-01-10&end_date=2025-02-28") == "2"
+        # 日次集計のカテゴリーなし（UNCATEGORIZED_ID）の件数ではなく、一覧と同じ0件
+        response = client.get(f"/api/v1/transactions/?category_id=0&total_count={mode}")
+        assert response.json() == []
+        assert response.headers["X-Total-Count"] == "0"
+
+    # 件数カウンターがずれても日次集計の再構築で直る
+    db_session.query(UserTransactionStats).update({"transaction_count": 100})
+    db_session.commit()
+    assert total("total_count=estimated") == "100"
+    assert total("total_count=exact") == "3"
+    rebuild_daily_totals(db_session)
+    assert total("total_count=estimated") == "3"
+
+
+def test_search_transactions(client, db_engine):
+    """説明文の全文検索（関連度順・既存フィルターとの併用）のテスト"""
+    if db_engine.dialect.name == "postgresql":
+        with db_engine.connect() as connection:
+            installed = connection.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first()
+        if installed is None:
+            pytest.skip("pg_trgm is not available")
+
+    ids = {}
+    for description, transaction_type, transaction_date in [
+        ("Amazon", "expense", "2025-01-05"),
+        ("Amazonian rainforest tour book", "expense", "2025-01-20"),
+        ("スーパーで買い物", "expense", "2025-01-21"),
+        ("AMAZON refund", "income", "2025-02-01"),
+        ("50% off sale", "expense", "2025-02-02"),
+        (None, "expense", "2025-02-03"),
+    ]:
+        ids[description] = client.post(
+            "/api/v1/transactions/",
+            json={
+                "amount": 1000,
+                "transaction_type": transaction_type,
+                "description": description,
+                "transaction_date": transaction_date,
+            }
+        ).json()["id"]
+
+    def search(query: str) -> list[str]:
+        response = client.get(f"/api/v1/transactions/?{query}")
+        assert response.status_code == status.HTTP_200_OK
+        return [item["description"] for item in response.json()]
+
+    # 大文字小文字を区別せず部分一致し、関連度の高いものが先
+    results = search("q=amazon")
+    assert sorted(results) == ["AMAZON refund", "Amazon", "Amazonian rainforest tour book"]
+    assert results.index("Amazon") < results.index("Amazonian rainforest tour book")
+    assert search("q=amazon&transaction_type=expense&end_date=2025-01-31&limit=1") == ["Amazon"]
+    assert search("q=amazon&transaction_type=income&fields=description") == ["AMAZON refund"]
+    assert search("q=買い物") == ["スーパーで買い物"]
+    assert search("q=コンビニ") == []
+    # ワイルドカード・演算子として解釈しない
+    assert search("q=50%25") == ["50% off sale"]
+    assert search("q=%25%25%25") == []
+    assert search('q="OR"') == []
+
+    # 更新・削除が検索に反映される
+    client.put(
+        f"/api/v1/transactions/{ids['Amazon']}",
+        json={"amount": 1000, "transaction_type": "expense", "description": "楽天市場", "transaction_date": "2025-01-05"}
+    )
+    client.delete(f"/api/v1/transactions/{ids['AMAZON refund']}")
+    assert search("q=amazon") == ["Amazonian rainforest tour book"]
+    assert search("q=楽天市") == ["楽天市場"]
+    response = client.get("/api/v1/transactions/?q=amazon&total_count=estimated")
+    assert response.headers["X-Total-Count"] == "1"
+    assert "X-Next-Cursor" not in client.get("/api/v1/transactions/?q=amazon&limit=1").headers
+
+    assert client.get("/api/v1/transactions/?q=am").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.get("/api/v1/transactions/?q=amazon&cursor=abc")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_transactions_etag(client):
+    """一覧のETagと、変更がない場合の304のテスト"""
+    item = {"amount": 1000, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    transaction_id = client.post("/api/v1/transactions/", json=item).json()["id"]
+
+    response = client.get("/api/v1/transactions/")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    # 変更がなければ本文なしの304
+    not_modified = client.get("/api/v1/transactions/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+
+    # 作成・更新・削除でETagが変わる
+    etags = {etag}
+    client.post("/api/v1/transactions/", json=item)
+    etags.add(client.get("/api/v1/transactions/").headers["ETag"])
+    client.put(f"/api/v1/transactions/{transaction_id}", json={**item, "amount": 2000})
+    etags.add(client.get("/api/v1/transactions/").headers["ETag"])
+    client.delete(f"/api/v1/transactions/{transaction_id}")
+    response = client.get("/api/v1/transactions/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    etags.add(response.headers["ETag"])
+    assert len(etags) == 4
+
+
+def test_get_transactions_etag_changes_on_category_delete(client):
+    """カテゴリー削除（トランザクションのカテゴリーがなくなる）でETagが変わるテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "食費"}).json()["id"]
+    client.post(
+        "/api/v1/transactions/",
+        json={"category_id": category_id, "amount": 1000, "transaction_type": "expense", "transaction_date": "2025-01-05"}
+    )
+    etag = client.get("/api/v1/transactions/").headers["ETag"]
+
+    client.delete(f"/api/v1/categories/{category_id}")
+    response = client.get("/api/v1/transactions/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["category_id"] is None
@@ -96,6 +96,20 @@ def test_get_users(client):
     assert data[1]["email"] == "test2@example.com"
 
 
+def test_get_users_total_count(client):
+    """指定時のみ X-Total-Count を返すテスト"""
+    for i in range(3):
+        client.post("/api/v1/users/", json={"email": f"user{i}@example.com", "username": f"user{i}"})
+
+    assert "X-Total-Count" not in client.get("/api/v1/users/?limit=1").headers
+    response = client.get("/api/v1/users/?limit=1&total_count=exact")
+    assert len(response.json()) == 1
+    assert response.headers["X-Total-Count"] == "3"
+    # PostgreSQLでもANALYZE前は推定値がないため実数
+    assert client.get("/api/v1/users/?total_count=estimated").headers["X-Total-Count"] == "3"
+    assert client.get("/api/v1/users/?total_count=all").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 def test_update_user(client):
     """ユーザー更新のテスト"""
     # ユーザー作成
@@ -150,3 +164,70 @@ def test_delete_user_not_found(client):
     response = client.delete("/api/v1/users/9999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json()["detail"] == "User not found"
+
+
+def test_update_user_duplicate_email(client):
+    """他のユーザーと重複するメールアドレスへの更新でエラーのテスト"""
+    client.post(
+        "/api/v1/users/",
+        json={"email": "test1@example.com", "username": "testuser1"}
+    )
+    create_response = client.post(
+        "/api/v1/users/",
+        json={"email": "test2@example.com", "username": "testuser2"}
+    )
+    user_id = create_response.json()["id"]
+
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"email": "test1@example.com", "username": "testuser2"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_update_user_duplicate_username(client):
+    """他のユーザーと重複するユーザー名への更新でエラーのテスト"""
+    client.post(
+        "/api/v1/users/",
+        json={"email": "test1@example.com", "username": "testuser1"}
+    )
+    create_response = client.post(
+        "/api/v1/users/",
+        json={"email": "test2@example.com", "username": "testuser2"}
+    )
+    user_id = create_response.json()["id"]
+
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"email": "test2@example.com", "username": "testuser1"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Username already taken"
+
+    # 自分自身と同じ値への更新は成功
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"email": "test2@example.com", "username": "testuser2"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_user_query_budgets(client, query_counter):
+    """ユーザーAPIのSQL発行数の上限"""
+    for i in range(3):
+        client.post("/api/v1/users/", json={"email": f"user{i}@example.com", "username": f"user{i}"})
+
+    with query_counter.max_queries(1):
+        user_id = client.post("/api/v1/users/", json={"email": "test@example.com", "username": "testuser"}).json()["id"]
+    with query_counter.max_queries(1):
+        client.get(f"/api/v1/users/{user_id}")
+    with query_counter.max_queries(1):
+        assert len(client.get("/api/v1/users/").json()) == 4
+    with query_counter.max_queries(2):
+        client.get("/api/v1/users/?total_count=exact")
+    with query_counter.max_queries(1):
+        client.put(f"/api/v1/users/{user_id}", json={"email": "new@example.com", "username": "newuser"})
+    # ユーザー取得・関連トランザクションの読み込み・削除
+    with query_counter.max_queries(3):
+        client.delete(f"/api/v1/users/{user_id}")